@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+"""
+    Times FileStorage.save() and reload() on generated objects with every
+    compressor and reports the size of file.json for each.
+    Usage: ./benchmarks/compression.py [objects]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.chdir(tempfile.mkdtemp())
+
+from models import storage  # noqa: E402 (reads file.json of the temp dir)
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+from models.user import User  # noqa: E402
+
+
+def main(count):
+    """generates count objects then saves and reloads them per codec"""
+    for i in range(count // 4):
+        user = User()
+        user.email = "user{}@example.com".format(i)
+        user.first_name = "Betty"
+        place = Place()
+        place.user_id = user.id
+        place.name = "place {}".format(i)
+        place.description = "a nice place to stay " * 4
+        place.number_rooms = i % 7
+        place.latitude = 37.77 + i / 1e5
+        for j in range(2):
+            review = Review()
+            review.place_id = place.id
+            review.user_id = user.id
+            review.text = "great stay " * 8
+    print("{} objects".format(count))
+    print("{:<8} {:>10} {:>7} {:>9} {:>9}".format(
+        "codec", "bytes", "ratio", "save", "reload"))
+    plain = None
+    for codec in (None, "gzip", "bz2", "lzma"):
+        storage.compression = codec
+        FileStorage._FileStorage__fragments = {}
+        start = time.perf_counter()
+        storage.save()
+        saved = time.perf_counter() - start
+        size = os.path.getsize("file.json")
+        plain = plain or size
+        objects = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        start = time.perf_counter()
+        storage.reload()
+        loaded = time.perf_counter() - start
+        FileStorage._FileStorage__objects = objects
+        print("{:<8} {:>10} {:>6.1f}x {:>8.3f}s {:>8.3f}s".format(
+            codec or "none", size, plain / size, saved, loaded))
+    os.remove("file.json")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
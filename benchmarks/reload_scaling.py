@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+"""
+    Times FileStorage.reload() on a generated file.json with 1 to N
+    worker processes.
+    Usage: ./benchmarks/reload_scaling.py [objects] [max workers]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.chdir(tempfile.mkdtemp())
+
+from models import storage  # noqa: E402 (reads file.json of the temp dir)
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+
+
+def main(count, workers):
+    """generates count objects then times a reload per worker count"""
+    for i in range(count // 2):
+        place = Place()
+        place.name = "place {}".format(i)
+        place.description = "a nice place to stay " * 4
+        place.number_rooms = i % 7
+        Review().text = "great stay " * 8
+    storage.save()
+    size = os.path.getsize("file.json")
+    print("{} objects, {:.1f} MB".format(count, size / 1e6))
+    storage.parallel_min_size = 0
+    base = None
+    for n in range(1, workers + 1):
+        FileStorage._FileStorage__objects = {}
+        storage.reload_workers = n
+        start = time.perf_counter()
+        storage.reload()
+        took = time.perf_counter() - start
+        base = base or took
+        print("{:>3} workers  {:7.3f}s  x{:.2f}".format(n, took, base / took))
+    os.remove("file.json")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count())
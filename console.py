@@ -3,17 +3,11 @@
 # + which creats instances, modify instances, delete instances and so on
 
 import cmd
-from models.base_model import BaseModel
+from models.base_model import classes
 from models import storage
 import sys
 import json
 import os
-from models.user import User
-from models.place import Place
-from models.state import State
-from models.city import City
-from models.amenity import Amenity
-from models.review import Review
 import re
 
 
@@ -22,20 +16,62 @@ class HBNBCommand(cmd.Cmd):
        uniquely for our project where it take care instances"""
 
     prompt = "(hbnb) "
-    existingClasses = {'BaseModel': BaseModel, 'User': User, 'City': City,
-                       'Place': Place, 'Amenity': Amenity, 'Review': Review,
-                       'State': State}
+    existingClasses = classes
 
     def do_quit(self, arg):
         """ allows the exit of our program on quit"""
         print()
+        storage.close()
         exit()
 
     def do_EOF(self, arg):
         """ allows the exit of our program on EOF"""
         print()
+        storage.close()
         exit()
 
+    def do_begin(self, arg):
+        """ opens a transaction, changes are saved on commit """
+        if storage.in_transaction():
+            print("** transaction already open **")
+            return
+        storage.begin()
+
+    def do_commit(self, arg):
+        """ saves the changes made since begin """
+        if not storage.in_transaction():
+            print("** no transaction open **")
+            return
+        storage.commit()
+
+    def do_rollback(self, arg):
+        """ undoes the changes made since begin """
+        if not storage.in_transaction():
+            print("** no transaction open **")
+            return
+        storage.rollback()
+
+    def do_bgsave(self, arg):
+        """ writes a snapshot from a background process,
+           bgsave status tells how the last one went """
+        if not hasattr(storage, "bgsave"):
+            print("** not supported by this storage **")
+        elif arg.strip() == "status":
+            status = storage.bgsave_status()
+            line = status["state"]
+            if status["pid"]:
+                line += " (pid {})".format(status["pid"])
+            if status["finished"]:
+                line += " in {:.3f}s".format(status["finished"] -
+                                             status["started"])
+            print(line)
+        elif arg:
+            print("** unknown option **")
+        elif storage.bgsave():
+            print("Background saving started")
+        else:
+            print("** background save already in progress **")
+
     def emptyline(self):
         """ overides the default emptyline method which executes the
            previous line and just do nothing"""
@@ -66,12 +102,11 @@ class HBNBCommand(cmd.Cmd):
             if len(arg) == 1:
                 print("** instance id missing **")
                 return
-            store = storage.all()
-            key = arg[0] + '.' + arg[1]
-            if key not in store:
+            obj = storage.get(arg[0], arg[1])
+            if obj is None:
                 print("** no instance found **")
             else:
-                print(store[key])
+                print(obj)
         return
 
     def do_destroy(self, arg):
@@ -86,12 +121,11 @@ class HBNBCommand(cmd.Cmd):
             if len(arg) == 1:
                 print("** instance id missing **")
                 return
-            store = storage.all()
-            key = arg[0] + '.' + arg[1]
-            if key not in store:
+            obj = storage.get(arg[0], arg[1])
+            if obj is None:
                 print("** no instance found **")
             else:
-                store.pop(key)
+                storage.delete(obj)
                 storage.save()
         return
 
@@ -100,12 +134,11 @@ class HBNBCommand(cmd.Cmd):
            based or not on the class name"""
         arg = arg.split()
         if len(arg) == 0:
-            print([str(value) for value in storage.all().values()])
+            print([str(value) for value in storage.copy().values()])
         elif arg[0] not in self.existingClasses or len(arg) > 1:
             print("** class doesn't exist **")
         else:
-            new = [str(value) for key, value in storage.all().items()
-                   if key.split(".")[0] == arg[0]]
+            new = [str(value) for value in storage.by_class(arg[0]).values()]
             print(new)
 
     def do_update(self, arg):
@@ -121,9 +154,8 @@ class HBNBCommand(cmd.Cmd):
             if len(arg) == 1:
                 print("** instance id missing **")
                 return
-            store = storage.all()
-            key = arg[0] + '.' + arg[1]
-            if key not in store:
+            obj = storage.get(arg[0], arg[1])
+            if obj is None:
                 print("** no instance found **")
             else:
                 if len(arg) == 2:
@@ -131,8 +163,8 @@ class HBNBCommand(cmd.Cmd):
                 elif len(arg) == 3:
                     print("** value missing **")
                 else:
-                    setattr(store[key], arg[2], arg[3][1:-1])
-                    storage.save()
+                    setattr(obj, arg[2], arg[3][1:-1])
+                    obj.save()
         return
 
     def do_count(self, arg):
@@ -144,11 +176,7 @@ class HBNBCommand(cmd.Cmd):
         if arg[0] not in self.existingClasses:
             print("** class doesn't exist **")
         else:
-            i = 0
-            for value in storage.all().values():
-                if value.__class__.__name__ == arg[0]:
-                    i += 1
-            print(i)
+            print(storage.count(arg[0]))
 
     def default(self, arg):
         """ handles <class name>.func() commands"""
@@ -1,5 +1,53 @@
 #!/use/bin/python3
-""" initialising the class Filestorage """
-from models.engine.file_storage import FileStorage
-storage = FileStorage()
+""" initialising the storage engine picked by HBNB_TYPE_STORAGE """
+import os
+# every model is imported here so it joins the registry before reload()
+from models.base_model import BaseModel
+from models.user import User
+from models.state import State
+from models.city import City
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+if os.getenv("HBNB_TYPE_STORAGE") == "sqlite":
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage()
+elif os.getenv("HBNB_TYPE_STORAGE") == "bitcask":
+    from models.engine.bitcask_storage import BitcaskStorage
+    storage = BitcaskStorage()
+elif os.getenv("HBNB_TYPE_STORAGE") == "lsm":
+    from models.engine.lsm_storage import LSMStorage
+    storage = LSMStorage()
+elif os.getenv("HBNB_TYPE_STORAGE") == "dbm":
+    from models.engine.dbm_storage import DBMStorage
+    storage = DBMStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
+    if os.getenv("HBNB_FILE_JOURNAL"):
+        storage.journal = True
+    if os.getenv("HBNB_SNAPSHOT_CACHE"):
+        storage.snapshot_cache = True
+    if os.getenv("HBNB_LAZY_RELOAD"):
+        storage.lazy = True
+    if os.getenv("HBNB_SHARDED"):
+        storage.sharded = True
+    if os.getenv("HBNB_MAX_OBJECTS"):
+        storage.max_objects = int(os.getenv("HBNB_MAX_OBJECTS"))
+    if os.getenv("HBNB_MAX_BYTES"):
+        storage.max_bytes = int(os.getenv("HBNB_MAX_BYTES"))
+    if os.getenv("HBNB_BLOB_THRESHOLD"):
+        storage.blob_threshold = int(os.getenv("HBNB_BLOB_THRESHOLD"))
+    if os.getenv("HBNB_COMPRESSION"):
+        storage.compression = os.getenv("HBNB_COMPRESSION")
+    if os.getenv("HBNB_NO_FRAGMENT_CACHE"):
+        storage.fragment_cache = False
+    if os.getenv("HBNB_SHARED_FILE"):
+        storage.shared = True
+    if os.getenv("HBNB_INCREMENTAL_RELOAD"):
+        storage.incremental = True
+    if os.getenv("HBNB_RELOAD_WORKERS"):
+        storage.reload_workers = int(os.getenv("HBNB_RELOAD_WORKERS"))
+    if os.getenv("HBNB_FLUSH_INTERVAL"):
+        storage.flush_interval = float(os.getenv("HBNB_FLUSH_INTERVAL"))
 storage.reload()
@@ -4,11 +4,21 @@
 import uuid
 from datetime import datetime
 import models
+from models.engine.blob_store import BlobRef
+
+# every model class by name, filled in as the classes are defined
+classes = {}
 
 
 class BaseModel():
     """BaseModel that defines all common attributes/methods
        for other classes"""
+
+    def __init_subclass__(cls, **kwargs):
+        """adds every subclass to the model registry"""
+        super().__init_subclass__(**kwargs)
+        classes[cls.__name__] = cls
+
     def __init__(self, *args, **kwargs):
         """initialise basemodel class instances"""
         if kwargs:
@@ -30,6 +40,16 @@ class BaseModel():
             self.updated_at = self.created_at
             models.storage.new(self)
 
+    def __setattr__(self, name, value):
+        """ sets the attribute through storage so it sees the change """
+        models.storage.touch(self, name, value)
+
+    def __delattr__(self, name):
+        """ deletes the attribute, marking the whole instance changed in
+           storage so the attribute goes from the saved record too """
+        models.storage.changed(self)
+        object.__delattr__(self, name)
+
     def __str__(self):
         """returns the string representation of an instance"""
         return "[{}] ({}) {}".format(self.__class__.__name__,
@@ -38,13 +58,40 @@ class BaseModel():
     def save(self):
         """ updates the updated_at and saves a instance to the file storage """
         self.updated_at = datetime.now()
+        models.storage.changed(self)
         models.storage.save()
 
+    @classmethod
+    def from_dict(cls, dic):
+        """builds an instance from a to_dict() dictionary; the fast path
+           used by the storage engines, it skips __init__ and __setattr__
+           and parses the timestamps with fromisoformat"""
+        obj = cls.__new__(cls)
+        attrs = obj.__dict__
+        if 'id' not in dic:
+            attrs['id'] = str(uuid.uuid4())
+        if 'created_at' not in dic:
+            attrs['created_at'] = datetime.now()
+        if 'updated_at' not in dic:
+            attrs['updated_at'] = datetime.now()
+        attrs.update(dic)
+        attrs.pop('__class__', None)
+        for key in ('created_at', 'updated_at'):
+            if type(attrs[key]) is str:
+                attrs[key] = datetime.fromisoformat(attrs[key])
+        return obj
+
     def to_dict(self):
         """returns a dictionary containing all keys/values
            of the instance dictionary"""
         dic = self.__dict__.copy()
+        for key, value in dic.items():
+            if type(value) is BlobRef:
+                dic[key] = getattr(self, key)
         dic['__class__'] = self.__class__.__name__
         dic['created_at'] = self.created_at.isoformat()
         dic['updated_at'] = self.updated_at.isoformat()
         return dic
+
+
+classes[BaseModel.__name__] = BaseModel
@@ -0,0 +1,312 @@
+#!/usr/bin/python3
+# a class that handles our storage in an append-only data file
+import json
+import mmap
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+from models.engine.record_storage import RecordStorage
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# every record is the crc32 of the rest of it, the length of its key and
+# of its value, the key and the JSON value; a value length of _tombstone
+# marks the key as deleted and has no value
+_crc = struct.Struct(">I")
+_lengths = struct.Struct(">II")
+_head = _crc.size + _lengths.size
+_tombstone = 0xFFFFFFFF
+# a hint file starts with _magic and the size of the data file it covers,
+# then holds the value offset, value length and key length of every live
+# key followed by the key
+_hint_head = struct.Struct(">8sQ")
+_hint_entry = struct.Struct(">QII")
+_magic = b"HBNBHINT"
+
+
+class BitcaskStorage(RecordStorage):
+    """ class BitcaskStorage that appends every saved instance to a data
+       file as one length-prefixed record, Bitcask style
+
+       an index in memory maps each key to the offset of its latest value
+       in the data file, which is read back through mmap, so only the
+       objects used by this process are built and deleting appends a
+       tombstone
+
+       close() and merge() write the index to a hint file next to the data
+       file so reload() only scans the records appended after it; merge()
+       rewrites the data file with only the latest record of every live
+       key, which save() does on its own once more than merge_min_dead
+       bytes, and half of the file, are superseded records
+
+       several processes can append to the same data file: an fcntl lock
+       on it is held while the file is opened and around every append,
+       which first indexes the records others appended since """
+    __data_path = "file.cask"
+    __fl = None
+    __map = None
+    __size = 0
+    __live = 0
+    __index = {}
+    _objects = {}
+    _pending = {}
+    merge_min_dead = 4 * 1024 * 1024
+
+    def merge(self):
+        """ rewrites the data file with only the latest record of every
+           live key and writes a hint file for it """
+        self.__open()
+        tmp = BitcaskStorage.__data_path + ".merge"
+        with open(tmp, 'wb') as fl:
+            for part in BitcaskStorage.__index.values():
+                for key in part:
+                    fl.write(self.__record(key, self.__read(key)))
+            fl.flush()
+            os.fsync(fl.fileno())
+        self.__shut()
+        if os.path.isfile(self.__hint_path()):
+            os.remove(self.__hint_path())
+        os.replace(tmp, BitcaskStorage.__data_path)
+        self.__open()
+        self.__write_hint()
+
+    def close(self):
+        """ writes the hint file and closes the data file """
+        if BitcaskStorage.__fl is not None:
+            self.__write_hint()
+            self.__shut()
+
+    def _read(self, key):
+        """ the latest value of key in the data file, or None """
+        if self.__entry(key) is None:
+            return None
+        return self.__read(key)
+
+    def _stored(self, key):
+        """ tells if key has a live record """
+        return self.__entry(key) is not None
+
+    def _records(self, name=None):
+        """ yields the live keys of the class name, or of every class,
+           each with None so only the values built are read """
+        self.__open()
+        if name is None:
+            parts = list(BitcaskStorage.__index.values())
+        else:
+            parts = [BitcaskStorage.__index.get(name, {})]
+        for part in parts:
+            for key in list(part):
+                yield key, None
+
+    def _count(self, name=None):
+        """ the number of live keys of the class name, or of every class """
+        self.__open()
+        if name is None:
+            return sum(map(len, BitcaskStorage.__index.values()))
+        return len(BitcaskStorage.__index.get(name, ()))
+
+    def _write(self, records):
+        """ appends a record for every (key, value) and merges once enough
+           of the data file is superseded records """
+        self.__append([(key, None if value is None else
+                        json.dumps(value).encode('utf-8'))
+                       for key, value in records])
+        dead = BitcaskStorage.__size - BitcaskStorage.__live
+        if dead > self.merge_min_dead and dead * 2 > BitcaskStorage.__size:
+            self.merge()
+
+    def _reopen(self):
+        """ rebuilds the index from the hint and data files """
+        self.__shut()
+        self.__open()
+
+    def __hint_path(self):
+        """ path of the hint file kept next to the data file """
+        return BitcaskStorage.__data_path + ".hint"
+
+    def __open(self):
+        """ opens the data file and builds the index the first time """
+        if BitcaskStorage.__fl is not None:
+            return
+        BitcaskStorage.__fl = open(BitcaskStorage.__data_path, 'a+b')
+        BitcaskStorage.__index = {}
+        BitcaskStorage.__live = 0
+        with self.__locked():
+            BitcaskStorage.__size = os.fstat(
+                BitcaskStorage.__fl.fileno()).st_size
+            self.__cut(self.__scan(self.__read_hint()))
+
+    @contextmanager
+    def __locked(self):
+        """ holds the data file locked, so no other process appends to it
+           in between """
+        fd = BitcaskStorage.__fl.fileno()
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def __cut(self, good):
+        """ cuts off what follows the last whole record, ending at good; the
+           lock is held, so a torn record there was left by a writer that
+           died """
+        if good < BitcaskStorage.__size:
+            BitcaskStorage.__fl.truncate(good)
+            BitcaskStorage.__size = good
+
+    def __shut(self):
+        """ closes the map and the data file """
+        if BitcaskStorage.__map is not None:
+            BitcaskStorage.__map.close()
+            BitcaskStorage.__map = None
+        if BitcaskStorage.__fl is not None:
+            BitcaskStorage.__fl.close()
+            BitcaskStorage.__fl = None
+
+    def __mapped(self, end):
+        """ returns a map of the data file holding at least end bytes """
+        mapped = BitcaskStorage.__map
+        if mapped is None or len(mapped) < end:
+            if mapped is not None:
+                mapped.close()
+            mapped = BitcaskStorage.__map = mmap.mmap(
+                BitcaskStorage.__fl.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped
+
+    def __entry(self, key):
+        """ (offset, length) of the latest value of key, or None """
+        self.__open()
+        return BitcaskStorage.__index.get(key.partition(".")[0],
+                                          {}).get(key)
+
+    def __read(self, key):
+        """ returns the latest value of key in the data file """
+        offset, length = self.__entry(key)
+        return self.__mapped(offset + length)[offset:offset + length]
+
+    @staticmethod
+    def __record(key, value):
+        """ bytes of the record of key, value None being a tombstone """
+        key = key.encode('utf-8')
+        if value is None:
+            body = _lengths.pack(len(key), _tombstone) + key
+        else:
+            body = _lengths.pack(len(key), len(value)) + key + value
+        return _crc.pack(zlib.crc32(body)) + body
+
+    def __index_record(self, key, offset, length):
+        """ points key at the value at offset, or drops it when length is
+           None, keeping count of the bytes of live records """
+        part = BitcaskStorage.__index.setdefault(key.partition(".")[0], {})
+        klen = len(key.encode('utf-8'))
+        old = part.pop(key, None)
+        if old is not None:
+            BitcaskStorage.__live -= _head + klen + old[1]
+        if length is not None:
+            part[key] = (offset, length)
+            BitcaskStorage.__live += _head + klen + length
+        elif not part:
+            del BitcaskStorage.__index[key.partition(".")[0]]
+
+    def __append(self, records):
+        """ appends the (key, value) records to the data file in one write
+           at its real end and points the index at them """
+        if not records:
+            return
+        self.__open()
+        with self.__locked():
+            pos = BitcaskStorage.__size
+            BitcaskStorage.__size = os.fstat(
+                BitcaskStorage.__fl.fileno()).st_size
+            if BitcaskStorage.__size > pos:
+                self.__cut(self.__scan(pos))
+            chunks, entries = [], []
+            offset = BitcaskStorage.__size
+            for key, value in records:
+                record = self.__record(key, value)
+                if value is None:
+                    entries.append((key, None, None))
+                else:
+                    entries.append((key, offset + len(record) - len(value),
+                                    len(value)))
+                chunks.append(record)
+                offset += len(record)
+            fl = BitcaskStorage.__fl
+            fl.write(b"".join(chunks))
+            fl.flush()
+            os.fsync(fl.fileno())
+            BitcaskStorage.__size = offset
+            for entry in entries:
+                self.__index_record(*entry)
+
+    def __scan(self, pos):
+        """ indexes the records from pos to the end of the data file and
+           returns the offset where the last whole record ends """
+        size = BitcaskStorage.__size
+        if pos >= size:
+            return pos
+        mapped = self.__mapped(size)
+        while pos + _head <= size:
+            crc, = _crc.unpack_from(mapped, pos)
+            klen, vlen = _lengths.unpack_from(mapped, pos + _crc.size)
+            start = pos + _head + klen
+            end = start if vlen == _tombstone else start + vlen
+            if (end > size or
+                    zlib.crc32(mapped[pos + _crc.size:end]) != crc):
+                break
+            key = mapped[pos + _head:start].decode('utf-8')
+            if vlen == _tombstone:
+                self.__index_record(key, None, None)
+            else:
+                self.__index_record(key, start, vlen)
+            pos = end
+        return pos
+
+    def __read_hint(self):
+        """ indexes the keys of the hint file and returns the size of the
+           data file it covers, or 0 when there is no usable hint, as when
+           it was cut short by a crash while it was written """
+        try:
+            with open(self.__hint_path(), 'rb') as fl:
+                data = fl.read()
+        except OSError:
+            return 0
+        if len(data) < _hint_head.size:
+            return 0
+        magic, covered = _hint_head.unpack_from(data, 0)
+        if magic != _magic or covered > BitcaskStorage.__size:
+            return 0
+        entries = []
+        pos = _hint_head.size
+        try:
+            while pos < len(data):
+                offset, length, klen = _hint_entry.unpack_from(data, pos)
+                pos += _hint_entry.size + klen
+                if pos > len(data) or offset + length > covered:
+                    return 0
+                entries.append((data[pos - klen:pos].decode('utf-8'),
+                                offset, length))
+        except (struct.error, UnicodeDecodeError):
+            return 0
+        for entry in entries:
+            self.__index_record(*entry)
+        return covered
+
+    def __write_hint(self):
+        """ writes the index to the hint file """
+        tmp = self.__hint_path() + ".tmp"
+        with open(tmp, 'wb') as fl:
+            fl.write(_hint_head.pack(_magic, BitcaskStorage.__size))
+            for part in BitcaskStorage.__index.values():
+                for key, (offset, length) in part.items():
+                    key = key.encode('utf-8')
+                    fl.write(_hint_entry.pack(offset, length, len(key)) + key)
+            fl.flush()
+            os.fsync(fl.fileno())
+        os.replace(tmp, self.__hint_path())
@@ -0,0 +1,191 @@
+#!/usr/bin/python3
+# keeps long strings out of line in a content-addressed blob file
+import hashlib
+import os
+import struct
+import threading
+
+# every blob is its sha1 digest and length followed by its utf-8 bytes
+_head = struct.Struct(">20sI")
+_missing = object()
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class BlobStore:
+    """ class BlobStore that appends strings to a file once per distinct
+       content and reads them back by the hex sha1 of their content """
+
+    def __init__(self, path):
+        """ opens the blob file at path, indexing the blobs it holds and
+           cutting off a torn one left by an interrupted append """
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__index = {}
+        self.__fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND,
+                            0o644)
+        size = os.fstat(self.__fd).st_size
+        pos = 0
+        with open(path, 'rb') as fl:
+            while pos + _head.size <= size:
+                fl.seek(pos)
+                digest, length = _head.unpack(fl.read(_head.size))
+                if pos + _head.size + length > size:
+                    break
+                self.__index[digest.hex()] = (pos + _head.size, length)
+                pos += _head.size + length
+        if pos < size:
+            os.ftruncate(self.__fd, pos)
+
+    @classmethod
+    def open(cls, path):
+        """ returns the store of the blob file at path, opening it again
+           if the file was replaced or removed since """
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None or not store.current():
+                if store is not None:
+                    store.close()
+                store = _stores[path] = cls(path)
+            return store
+
+    def current(self):
+        """ tells if the file at path is still the one this store has open """
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        opened = os.fstat(self.__fd)
+        return (st.st_ino, st.st_dev) == (opened.st_ino, opened.st_dev)
+
+    def close(self):
+        """ closes the blob file """
+        with self.__lock:
+            os.close(self.__fd)
+
+    def put(self, text):
+        """ stores text unless the same content is stored already and
+           returns its reference """
+        data = text.encode('utf-8')
+        digest = hashlib.sha1(data)
+        ref = digest.hexdigest()
+        with self.__lock:
+            if ref not in self.__index:
+                os.write(self.__fd, _head.pack(digest.digest(), len(data)) +
+                         data)
+                end = os.lseek(self.__fd, 0, os.SEEK_CUR)
+                self.__index[ref] = (end - len(data), len(data))
+        return ref
+
+    def compact(self, keep):
+        """ rewrites the blob file with only the blobs whose reference is
+           in keep, returns how many bytes it reclaimed """
+        tmp = self.path + ".tmp"
+        with self.__lock:
+            index = {}
+            with open(tmp, 'wb') as fl:
+                for ref, (offset, length) in self.__index.items():
+                    if ref in keep:
+                        fl.write(_head.pack(bytes.fromhex(ref), length))
+                        index[ref] = (fl.tell(), length)
+                        fl.write(os.pread(self.__fd, length, offset))
+                fl.flush()
+                os.fsync(fl.fileno())
+                size = fl.tell()
+            before = os.fstat(self.__fd).st_size
+            os.replace(tmp, self.path)
+            os.close(self.__fd)
+            self.__fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+            self.__index = index
+        return before - size
+
+    def get(self, ref):
+        """ returns the string stored under ref """
+        with self.__lock:
+            offset, length = self.__index[ref]
+            os.lseek(self.__fd, offset, os.SEEK_SET)
+            data = os.read(self.__fd, length)
+        return data.decode('utf-8')
+
+
+class BlobRef:
+    """ class BlobRef that stands, in an instance's __dict__, for a string
+       kept in a blob file until the attribute is first read """
+    __slots__ = ("path", "ref")
+
+    def __init__(self, path, ref):
+        """ points at the blob ref of the blob file at path """
+        self.path = path
+        self.ref = ref
+
+    def __getstate__(self):
+        """ state for pickle, which does not see __slots__ by itself """
+        return (self.path, self.ref)
+
+    def __setstate__(self, state):
+        """ restores the state made by __getstate__ """
+        self.path, self.ref = state
+
+    def load(self):
+        """ reads the string from the blob file """
+        return BlobStore.open(self.path).get(self.ref)
+
+    def __repr__(self):
+        """ the repr of the string, so printing __dict__ is unchanged """
+        return repr(self.load())
+
+
+class BlobAttribute:
+    """ class BlobAttribute, installed on a model class for an attribute
+       that may hold a BlobRef, which it replaces by the string on first
+       read; reading the attribute is otherwise unchanged """
+
+    def __init__(self, name, default=_missing):
+        """ describes attribute name, default being the class value """
+        self.name = name
+        self.default = default
+
+    def __get__(self, obj, owner=None):
+        """ the attribute of obj, loading it from its blob the first time """
+        if obj is None:
+            if self.default is _missing:
+                raise AttributeError(self.name)
+            return self.default
+        value = obj.__dict__.get(self.name, _missing)
+        if value is _missing:
+            if self.default is _missing:
+                raise AttributeError(self.name)
+            return self.default
+        if type(value) is BlobRef:
+            value = obj.__dict__[self.name] = value.load()
+        return value
+
+    def __set__(self, obj, value):
+        """ sets the attribute of obj """
+        obj.__dict__[self.name] = value
+
+    def __delete__(self, obj):
+        """ deletes the attribute of obj """
+        try:
+            del obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+
+def _forget_stores():
+    """ makes a forked child open its own stores, so it never moves the
+       file offset it would otherwise share with its parent """
+    global _stores_lock
+    _stores_lock = threading.Lock()
+    _stores.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_stores)
+
+
+def install(cls, name):
+    """ puts a BlobAttribute for attribute name on cls unless there is
+       one, keeping the value cls had for it as the default """
+    if not isinstance(cls.__dict__.get(name), BlobAttribute):
+        setattr(cls, name, BlobAttribute(name, getattr(cls, name, _missing)))
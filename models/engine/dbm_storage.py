@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+# a class that handles our storage in a dbm key/value database
+import dbm
+import json
+from models.engine.record_storage import RecordStorage
+
+
+class DBMStorage(RecordStorage):
+    """ class DBMStorage that keeps every instance as its own record of a
+       dbm database, keyed by Class.id and holding the JSON of to_dict()
+
+       save() only writes and deletes the records of the changed objects,
+       and only the objects used by this process are built; the keys of
+       every class are found by their Class. prefix, collected once when
+       the database is opened and kept up to date by save() """
+    __db_path = "file.dbm"
+    __db = None
+    __keys = {}
+    _objects = {}
+    _pending = {}
+
+    def close(self):
+        """ closes the database """
+        if DBMStorage.__db is not None:
+            DBMStorage.__db.close()
+            DBMStorage.__db = None
+
+    def _read(self, key):
+        """ the JSON of the record of key, or None """
+        if not self._stored(key):
+            return None
+        return self.__open()[key]
+
+    def _stored(self, key):
+        """ tells if a record exists for key """
+        self.__open()
+        return key in DBMStorage.__keys.get(key.partition(".")[0], ())
+
+    def _records(self, name=None):
+        """ yields the keys of the records of the class name, or of every
+           record, each with None so only the records built are read """
+        self.__open()
+        if name is None:
+            parts = list(DBMStorage.__keys.values())
+        else:
+            parts = [DBMStorage.__keys.get(name, ())]
+        for keys in parts:
+            for key in list(keys):
+                yield key, None
+
+    def _count(self, name=None):
+        """ the number of records of the class name, or of every record """
+        self.__open()
+        if name is None:
+            return sum(map(len, DBMStorage.__keys.values()))
+        return len(DBMStorage.__keys.get(name, ()))
+
+    def _write(self, records):
+        """ writes and deletes the records """
+        db = self.__open()
+        for key, value in records:
+            keys = DBMStorage.__keys.setdefault(key.partition(".")[0], set())
+            if value is None:
+                if key in keys:
+                    del db[key]
+                    keys.discard(key)
+            else:
+                db[key] = json.dumps(value)
+                keys.add(key)
+        if hasattr(db, "sync"):
+            db.sync()
+
+    def _reopen(self):
+        """ closes and opens the database """
+        self.close()
+        self.__open()
+
+    def __open(self):
+        """ returns the database, opening it and collecting the keys of
+           every class the first time """
+        if DBMStorage.__db is None:
+            db = dbm.open(DBMStorage.__db_path, 'c')
+            DBMStorage.__keys = {}
+            for key in db.keys():
+                key = key.decode('utf-8')
+                DBMStorage.__keys.setdefault(key.partition(".")[0],
+                                             set()).add(key)
+            DBMStorage.__db = db
+        return DBMStorage.__db
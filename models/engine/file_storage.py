@@ -1,44 +1,1350 @@
 #!/usr/bin/python3
 # a class that handles our file storage
+import atexit
+import bz2
+import gzip
 import json
+import lzma
 import uuid
 import os
+import re
+import shutil
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from datetime import datetime
-from models.base_model import BaseModel
-from models.user import User
-from models.state import State
-from models.city import City
-from models.amenity import Amenity
-from models.place import Place
-from models.review import Review
+from itertools import chain
+from models.engine.blob_store import BlobRef, BlobStore, install
+from models.engine.json_stream import TruncatedError, iter_items
+from models.engine.lazy_records import LazyRecords
+from models.engine.parallel_reload import iter_records
+from models.engine.rwlock import RWLock
+from models.engine.snapshot_cache import SnapshotCache
+from models.engine.spill import Spill
+from models.engine.versions import Snapshot, Versions
+from models.engine.transaction import Transaction
+from models.base_model import classes
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# the stream compressors the JSON file can be written with, the file
+# extensions that pick them, and the magic bytes that tell them apart
+_codecs = {"gzip": gzip, "bz2": bz2, "lzma": lzma}
+_extensions = {".gz": "gzip", ".bz2": "bz2", ".xz": "lzma", ".lzma": "lzma"}
+_magics = ((b"\x1f\x8b", "gzip"), (b"BZh", "bz2"),
+           (b"\xfd7zXZ\x00", "lzma"))
+# the attributes the key and the timestamps rely on, never moved to
+# the blob file, and the blob references in an encoded object
+_inline = ('id', 'created_at', 'updated_at')
+_blob_refs = re.compile(r'"__blob__": "([0-9a-f]{40})"')
 
 
 class FileStorage:
     """ class FileStorage that serializes instances to a JSON file
-       and deserializes JSON file to instances """
+       and deserializes JSON file to instances
+
+       objects are kept by key and partitioned by class name, and the
+       JSON fragment of every object is cached between saves, so a save
+       only encodes the objects changed since the last one; it writes a
+       temporary file renamed over the JSON file once complete. Options
+       are class attributes, all off by default:
+           journal: save() appends the changes to a log, folded back
+               into the file once it grows past journal_limit bytes
+           flush_interval: a background thread writes the saves every
+               that many seconds, or once flush_max_pending are waiting
+           fork_snapshots: the log is folded from a forked child, as
+               bgsave() writes a snapshot
+           snapshot_cache: reload() unpickles a SnapshotCache of the
+               objects while the file did not change
+           reload_workers: a file of at least parallel_min_size bytes is
+               decoded on that many processes
+           sharded: every class is saved to its own file
+           lazy: reload() keeps LazyRecords, built when asked for
+           max_objects, max_bytes: the objects over the budget go to a
+               Spill file
+           blob_threshold: strings that long go to a BlobStore
+           compression: the file is written through gzip, bz2 or lzma
+           shared: processes share the file under an fcntl lock and
+               merge what the others wrote
+           incremental: reload() updates the objects in place, as
+               refresh() does
+       progress is called with the count of objects loaded
+
+       a reader-writer lock guards the storage; all() returns the live
+       dictionary, copy() and by_class() copies safe to iterate, and
+       snapshot() a point-in-time Snapshot """
     __file_path = "file.json"
     __objects = {}
+    __classes = {}
+    __indexed = None
+    __pending = {}
+    __dirty = {}
+    __fragments = {}
+    __seen = None
+    __lock_fd = None
+    __versions = Versions()
+    __txn = None
+    __lock = RWLock()
+    __wakeup = threading.Condition(__lock)
+    __flusher = None
+    __unflushed = 0
+    __snapshots = 0
+    __bgsave = None
+    __cache = SnapshotCache()
+    __clean = set()
+    __raw = LazyRecords()
+    __spill = Spill()
+    journal = False
+    journal_limit = 4 * 1024 * 1024
+    progress = None
+    progress_every = 1000
+    flush_interval = None
+    flush_max_pending = 1000
+    fork_snapshots = False
+    snapshot_cache = False
+    reload_workers = None
+    parallel_min_size = 1 << 20
+    sharded = False
+    lazy = False
+    max_objects = None
+    max_bytes = None
+    blob_threshold = None
+    compression = None
+    compression_level = None
+    fragment_cache = True
+    shared = False
+    incremental = False
+    refresh_compare = "updated_at"
 
     def all(self):
-        """ returns a dictionary containing all objects """
+        """ returns the dictionary containing all objects, which other
+           threads may change while it is iterated; copy() returns one
+           that is safe to iterate. With a memory budget set the objects
+           do not all stay in memory, so it returns a copy as well """
+        if self.__budget() or FileStorage.__spill:
+            return self.copy()
+        if FileStorage.__raw:
+            with FileStorage.__lock:
+                self.__build_all()
         return FileStorage.__objects
 
+    def copy(self):
+        """ returns a copy of the dictionary all() returns, taken under
+           the lock, to iterate while other threads add or remove
+           objects """
+        if FileStorage.__raw or FileStorage.__spill:
+            with FileStorage.__lock:
+                self.__build_all()
+                found = dict(FileStorage.__objects)
+                self.__evict()
+                return found
+        with FileStorage.__lock.reading():
+            return dict(FileStorage.__objects)
+
+    def __build_all(self):
+        """ builds every record not built yet and every spilled object """
+        self.__partitions()
+        for name in FileStorage.__raw.names() | FileStorage.__spill.names():
+            self.__build_class(name)
+
     def new(self, obj):
         """ adds new objects to our private class instance 'object'"""
-        FileStorage.__objects[obj.__class__.__name__ + "." + str(obj.id)] = obj
+        key = obj.__class__.__name__ + "." + str(obj.id)
+        with FileStorage.__lock:
+            if FileStorage.__objects.get(key) is obj:
+                return
+            self.__build(key)
+            self.__capture(key)
+            if FileStorage.__pending.get(key) != "create":
+                if key in FileStorage.__objects:
+                    FileStorage.__pending[key] = "update"
+                else:
+                    FileStorage.__pending[key] = "create"
+            self.__remember(key)
+            self.__put(key, obj)
+            FileStorage.__dirty[key] = None
+            self.__evict()
+
+    def touch(self, obj, name, value):
+        """ sets attribute name of obj to value and records the change, so
+           its cached fragment is dropped and the next save writes it
+           again; in-place changes to a mutable attribute are not seen,
+           assign the attribute again or call changed() to have them
+           saved """
+        with FileStorage.__lock:
+            key = self.__mark(obj, name)
+            object.__setattr__(obj, name, value)
+            if key is not None:
+                self.__used(key, obj)
+
+    def changed(self, obj):
+        """ marks the whole of obj to be written again on the next save;
+           nothing is done when obj is not stored """
+        with FileStorage.__lock:
+            key = self.__mark(obj, None)
+            if key is not None:
+                self.__used(key, obj)
+
+    def get(self, cls, id):
+        """ returns the object of class cls with this id, or None """
+        key = self.__name(cls) + "." + str(id)
+        if self.__budget():
+            with FileStorage.__lock:
+                self.__partitions()
+                obj = FileStorage.__objects.get(key)
+                if obj is not None:
+                    FileStorage.__spill.stats["hits"] += 1
+                    self.__used(key, obj)
+                elif self.__build(key):
+                    obj = FileStorage.__objects[key]
+                    self.__evict()
+                return obj
+        if FileStorage.__raw:
+            with FileStorage.__lock:
+                self.__partitions()
+                self.__build(key)
+        return FileStorage.__objects.get(key)
+
+    def count(self, cls=None):
+        """ returns the number of objects of class cls, or of all objects
+           when cls is None """
+        with self.__reading():
+            parts = self.__partitions()
+            if cls is None:
+                return (len(FileStorage.__objects) +
+                        FileStorage.__raw.count() +
+                        FileStorage.__spill.count())
+            name = self.__name(cls)
+            return (len(parts.get(name, ())) +
+                    FileStorage.__raw.count(name) +
+                    FileStorage.__spill.count(name))
+
+    def by_class(self, cls):
+        """ returns a dictionary containing only the objects of class cls """
+        name = self.__name(cls)
+        if (not self.__budget() and not FileStorage.__raw.count(name) and
+                not FileStorage.__spill.count(name)):
+            with self.__reading():
+                return dict(self.__partitions().get(name, {}))
+        with FileStorage.__lock:
+            parts = self.__partitions()
+            self.__build_class(self.__name(cls))
+            found = dict(parts.get(self.__name(cls), {}))
+            self.__evict()
+            return found
+
+    def delete(self, obj=None):
+        """ removes obj from __objects if it is inside """
+        if obj is None:
+            return
+        key = obj.__class__.__name__ + "." + str(obj.id)
+        with FileStorage.__lock:
+            self.__build(key)
+            if key not in FileStorage.__objects:
+                return
+            self.__capture(key)
+            self.__remember(key)
+            self.__drop(key)
+            if FileStorage.__pending.get(key) == "create":
+                del FileStorage.__pending[key]
+            else:
+                FileStorage.__pending[key] = "delete"
 
     def save(self):
         """ serialize current __objects instance to JSON file"""
-        with open(FileStorage.__file_path, 'w', encoding='utf-8') as fl:
-            dic = {key: obj.to_dict() for key, obj in
-                   FileStorage.__objects.items()}
-            json.dump(dic, fl)
+        with FileStorage.__lock:
+            if FileStorage.__txn is not None:
+                FileStorage.__txn.deferred = True
+            elif self.flush_interval is None:
+                self.flush()
+            else:
+                FileStorage.__unflushed += 1
+                self.__start_flusher()
+                if FileStorage.__unflushed >= self.flush_max_pending:
+                    FileStorage.__wakeup.notify()
+
+    def flush(self):
+        """ writes the changes to the JSON file or the journal now; it
+           raises RuntimeError inside a transaction, which commit() ends """
+        with FileStorage.__lock:
+            self.__outside("flush")
+            with self.__exclusive():
+                self.__reap()
+                FileStorage.__unflushed = 0
+                if not self.journal:
+                    self.__write_snapshot()
+                    self.__evict()
+                    return
+                with open(self.__log_path(), 'a', encoding='utf-8') as fl:
+                    for key, op in FileStorage.__pending.items():
+                        record = {"op": op, "key": key}
+                        if op != "delete":
+                            if key not in FileStorage.__objects:
+                                continue
+                            data = self.__encode(FileStorage.__objects[key])
+                            names = FileStorage.__dirty.get(key)
+                            if names is None:
+                                record["op"] = "create"
+                            elif op == "update":
+                                data = {name: data[name] for name in names
+                                        if name in data}
+                            record["data"] = data
+                        fl.write(json.dumps(record) + "\n")
+                    size = fl.tell()
+                FileStorage.__pending.clear()
+                FileStorage.__dirty.clear()
+                self.__evict()
+                if size > self.journal_limit:
+                    if self.fork_snapshots:
+                        self.bgsave()
+                    else:
+                        self.compact()
+
+    def close(self):
+        """ stops the background flusher and writes what it left """
+        with FileStorage.__lock:
+            flusher = FileStorage.__flusher
+            FileStorage.__flusher = None
+            FileStorage.__wakeup.notify_all()
+        if flusher is not None:
+            flusher.join()
+        with FileStorage.__lock:
+            if FileStorage.__unflushed and FileStorage.__txn is None:
+                self.flush()
+            self.__reap(True)
+            self.__partitions()
+            if (self.snapshot_cache and not self.sharded and
+                    not FileStorage.__raw and not FileStorage.__spill and
+                    not FileStorage.__pending and
+                    FileStorage.__txn is None and
+                    os.path.isfile(FileStorage.__file_path) and
+                    not FileStorage.__cache.current(FileStorage.__file_path)):
+                FileStorage.__cache.write(FileStorage.__file_path,
+                                          FileStorage.__objects,
+                                          self.__put_in_place)
+            FileStorage.__spill.close()
+            FileStorage.__spill.clear(self.__spill_path(""))
+
+    def bgsave(self):
+        """ starts writing a snapshot from a forked child process, returns
+           False if one is already being written; it raises RuntimeError
+           inside a transaction, whose changes are not committed yet """
+        with FileStorage.__lock:
+            self.__outside("bgsave")
+            self.__reap()
+            if FileStorage.__bgsave and FileStorage.__bgsave["pid"]:
+                return False
+            if self.sharded or self.shared or not hasattr(os, "fork"):
+                started = time.time()
+                with self.__exclusive():
+                    self.__write_snapshot()
+                FileStorage.__bgsave = {"pid": None, "state": "done",
+                                        "started": started,
+                                        "finished": time.time()}
+                return True
+            offset = 0
+            if os.path.isfile(self.__log_path()):
+                offset = os.path.getsize(self.__log_path())
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    self.__write_file(self.__bgsave_path())
+                    code = 0
+                finally:
+                    os._exit(code)
+            FileStorage.__bgsave = {"pid": pid, "state": "running",
+                                    "started": time.time(),
+                                    "finished": None, "offset": offset,
+                                    "snapshots": FileStorage.__snapshots}
+            return True
+
+    def bgsave_status(self):
+        """ returns a dictionary describing the last background snapshot:
+           its state (idle, running, done or failed), the pid of the
+           child while it runs, and when it started and finished """
+        with FileStorage.__lock:
+            self.__reap()
+            if FileStorage.__bgsave is None:
+                return {"state": "idle", "pid": None, "started": None,
+                        "finished": None}
+            return {key: FileStorage.__bgsave[key] for key in
+                    ("state", "pid", "started", "finished")}
+
+    def cache_stats(self):
+        """ returns the hits, misses and evictions of the memory budget
+           and how many objects are in memory and spilled to disk """
+        with FileStorage.__lock:
+            stats = dict(FileStorage.__spill.stats)
+            stats["resident"] = len(FileStorage.__objects)
+            stats["spilled"] = FileStorage.__spill.count()
+            return stats
+
+    def begin(self):
+        """ opens a transaction, saves are deferred until commit() """
+        with FileStorage.__lock:
+            if FileStorage.__txn is not None:
+                raise RuntimeError("a transaction is already open")
+            dirty = {key: names if names is None else set(names)
+                     for key, names in FileStorage.__dirty.items()}
+            FileStorage.__txn = Transaction(
+                (dict(FileStorage.__pending), dirty))
+
+    def commit(self):
+        """ closes the transaction and does the saves it deferred """
+        with FileStorage.__lock:
+            txn = self.__end()
+            if txn.deferred:
+                self.save()
+
+    def rollback(self):
+        """ closes the transaction and undoes its changes in memory """
+        with FileStorage.__lock:
+            txn = self.__end()
+            for key in txn.before:
+                self.__remember(key)
+            txn.undo(self.__put, self.__drop)
+            FileStorage.__pending, FileStorage.__dirty = txn.saved
+
+    def in_transaction(self):
+        """ tells if a transaction is open """
+        return FileStorage.__txn is not None
+
+    @contextmanager
+    def transaction(self):
+        """ runs the with block in a transaction, committed at the end of
+           the block or rolled back if it raises """
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    def compact(self):
+        """ folds the journal back into a fresh JSON snapshot and drops the
+           blobs nothing refers to any more; it raises RuntimeError inside
+           a transaction """
+        with FileStorage.__lock:
+            self.__outside("compact")
+            with self.__exclusive():
+                self.__write_snapshot()
+                self.__compact_blobs()
 
     def reload(self):
         """ deserialize the JSON file back to the __object instance"""
-        if (os.path.isfile(FileStorage.__file_path)):
-            with open(FileStorage.__file_path, 'r', encoding="utf-8") as fl:
-                ld = json.load(fl)
-                for key, value in ld.items():
-                    FileStorage.__objects[key] = eval(
-                        value['__class__'])(**value)
+        with FileStorage.__lock:
+            FileStorage.__spill.clear(self.__spill_path(""))
+        if self.shared:
+            self.refresh("content")
+            return
+        if self.incremental:
+            self.refresh()
+            return
+        with FileStorage.__lock:
+            self.__load()
+            self.__evict()
+
+    def refresh(self, compare=None):
+        """ reads the file again and brings the objects in memory up to
+           date in place, returns the keys it added, changed and removed;
+           a record is taken as changed when its updated_at differs, or
+           with compare set to "content" when any attribute does """
+        compare = compare or self.refresh_compare
+        with FileStorage.__lock:
+            if not self.shared:
+                report = self.__refresh(compare)
+            else:
+                with self.__file_lock(False):
+                    stamp = self.__stamp()
+                    if stamp == FileStorage.__seen:
+                        report = {"added": [], "changed": [],
+                                  "removed": []}
+                    else:
+                        report = self.__refresh(compare)
+                        FileStorage.__seen = stamp
+            self.__evict()
+            return report
+
+    def __reading(self):
+        """ the lock held shared, or exclusively while the class
+           partitions have to be built again """
+        if FileStorage.__indexed is FileStorage.__objects:
+            return FileStorage.__lock.reading()
+        return FileStorage.__lock
+
+    def __lock_path(self):
+        """ path of the lock file shared processes lock and count their
+           writes in """
+        return FileStorage.__file_path + ".lock"
+
+    @contextmanager
+    def __file_lock(self, exclusive):
+        """ holds the lock file, exclusively or shared, unless this
+           process holds it already """
+        if FileStorage.__lock_fd is not None:
+            yield
+            return
+        fd = os.open(self.__lock_path(), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            FileStorage.__lock_fd = fd
+            yield
+        finally:
+            FileStorage.__lock_fd = None
+            os.close(fd)
+
+    @contextmanager
+    def __exclusive(self):
+        """ when shared, holds the lock file exclusively around a write,
+           merging first what other processes wrote since this one last
+           read or wrote the file, and counts the write """
+        if not self.shared or FileStorage.__lock_fd is not None:
+            yield
+            return
+        with self.__file_lock(True):
+            if self.__stamp() != FileStorage.__seen:
+                self.__refresh("content")
+            yield
+            generation = self.__generation() + 1
+            os.ftruncate(FileStorage.__lock_fd, 0)
+            os.pwrite(FileStorage.__lock_fd,
+                      str(generation).encode('ascii'), 0)
+            FileStorage.__seen = self.__stamp()
+
+    def __generation(self):
+        """ number of writes counted in the lock file this process holds """
+        data = os.pread(FileStorage.__lock_fd, 32, 0)
+        return int(data) if data.strip() else 0
+
+    def __stamp(self):
+        """ what tells if another process wrote the file: the path, the
+           write count and the size and mtime of the file, its journal and
+           its shards """
+        paths = [FileStorage.__file_path, self.__log_path()]
+        if self.sharded:
+            paths += [self.__shard_path(name) for name in sorted(classes)]
+        stats = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                stats.append((st.st_size, st.st_mtime_ns))
+            except OSError:
+                stats.append(None)
+        return (FileStorage.__file_path, self.__generation(), stats)
+
+    def snapshot(self):
+        """ opens a Snapshot of the objects as they are now """
+        with FileStorage.__lock:
+            version = FileStorage.__versions.open()
+        return Snapshot(version, self.__snapshot_keys, self.__snapshot_read,
+                        self.__snapshot_close)
+
+    def __remember(self, key):
+        """ keeps the state of key for the open snapshots before it
+           changes """
+        if FileStorage.__versions.readers:
+            FileStorage.__versions.remember(key, lambda: self.__state(key))
+
+    def __state(self, key):
+        """ the current state of key: a copy of its object, its record not
+           built yet, its spilled JSON, or None """
+        obj = FileStorage.__objects.get(key)
+        if obj is None and key in FileStorage.__spill:
+            obj = FileStorage.__spill.evicted.get(key)
+            if obj is None:
+                return FileStorage.__spill.read(key)
+        if obj is not None:
+            return self.__copy(obj)
+        return FileStorage.__raw.get(key)
+
+    @staticmethod
+    def __exists(key):
+        """ tells if key has an object now, built or not """
+        return (key in FileStorage.__objects or key in FileStorage.__raw or
+                key in FileStorage.__spill)
+
+    @staticmethod
+    def __copy(obj):
+        """ a copy of obj detached from the storage """
+        copy = obj.__class__.__new__(obj.__class__)
+        copy.__dict__.update(obj.__dict__)
+        return copy
+
+    def __snapshot_lock(self):
+        """ the lock snapshots read under: shared, unless the spill file
+           has to be read """
+        if FileStorage.__spill:
+            return FileStorage.__lock
+        return FileStorage.__lock.reading()
+
+    def __snapshot_keys(self, version):
+        """ the keys of the objects there were at version """
+        with self.__snapshot_lock():
+            versions = FileStorage.__versions
+            keys = dict.fromkeys(chain(
+                FileStorage.__objects,
+                FileStorage.__raw.keys(), FileStorage.__spill.keys(),
+                versions.history))
+            found = []
+            for key in keys:
+                kept, state = versions.visible(key, version)
+                if state is not None if kept else self.__exists(key):
+                    found.append(key)
+            return found
+
+    def __snapshot_read(self, keys, version):
+        """ the (key, object) pairs of the keys that had an object at
+           version, as they were then """
+        with self.__snapshot_lock():
+            found = []
+            for key in keys:
+                kept, state = self.__visible(key, version)
+                if state is None:
+                    continue
+                if isinstance(state, str):
+                    state = json.loads(state)
+                if isinstance(state, dict):
+                    found.append((key, self.__decode(state)))
+                else:
+                    found.append((key, self.__copy(state) if kept else state))
+            return found
+
+    def __visible(self, key, version):
+        """ (kept, state) of key at version, kept telling if the state is
+           one kept in its version chain """
+        kept, state = FileStorage.__versions.visible(key, version)
+        if kept:
+            return kept, state
+        return False, self.__state(key)
+
+    def __snapshot_close(self, version):
+        """ closes the snapshot opened at version """
+        with FileStorage.__lock:
+            FileStorage.__versions.close(version)
+
+    def __refresh(self, compare):
+        """ applies the state of the file to the objects in memory in
+           place, keeping the unsaved changes on top of it: the objects
+           that changed take the attributes of the file except the ones
+           changed here, the new ones are added and the ones gone from
+           the file are dropped unless changed here """
+        if compare not in ("updated_at", "content"):
+            raise ValueError("unknown comparison {!r}".format(compare))
+        report = {"added": [], "changed": [], "removed": []}
+        log = {}
+        for record in self.__log_records():
+            log.setdefault(record["key"], []).append(record)
+        seen = set()
+        for key, value in self.__snapshot_entries():
+            value = self.__fold(value, log.pop(key, ()))
+            if value is not None:
+                seen.add(key)
+                self.__sync(key, value, compare, report)
+        for key, records in log.items():
+            value = self.__fold(None, records)
+            if value is not None:
+                seen.add(key)
+                self.__sync(key, value, compare, report)
+        self.__partitions()
+        held = list(chain(FileStorage.__objects, FileStorage.__raw.keys(),
+                          FileStorage.__spill.keys()))
+        for key in held:
+            if key not in seen and key not in FileStorage.__pending:
+                self.__remember(key)
+                self.__drop(key)
+                report["removed"].append(key)
+        if self.progress is not None:
+            self.progress(len(seen))
+        return report
+
+    def __snapshot_entries(self):
+        """ yields the (key, value) entries of the shards, or of the JSON
+           file when there is no shard """
+        shards = self.__shards() if self.sharded else []
+        if shards:
+            for name in shards:
+                yield from self.__read_shard(self.__shard_path(name))
+        elif os.path.isfile(FileStorage.__file_path):
+            with self.__open_json(FileStorage.__file_path, 'r') as fl:
+                yield from iter_items(fl)
+
+    def __log_records(self):
+        """ yields the whole records of the journal """
+        if not os.path.isfile(self.__log_path()):
+            return
+        with open(self.__log_path(), 'rb') as fl:
+            for line in fl:
+                if not line.endswith(b"\n"):
+                    return
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+
+    @staticmethod
+    def __fold(value, records):
+        """ the stored dictionary value after the journal records of its
+           key, None once deleted """
+        for record in records:
+            if record["op"] == "delete":
+                value = None
+            elif record["op"] == "create":
+                value = record["data"]
+            elif value is not None:
+                value = dict(value, **record["data"])
+        return value
+
+    @staticmethod
+    def __same(old, value, compare):
+        """ tells if the stored dictionary value holds the same state as
+           old, an object or a dictionary not built yet """
+        if compare == "updated_at":
+            stamps = [old.__dict__.get('updated_at')
+                      if not isinstance(old, dict)
+                      else old.get('updated_at'), value.get('updated_at')]
+            for i, stamp in enumerate(stamps):
+                if type(stamp) is str:
+                    stamps[i] = datetime.fromisoformat(stamp)
+            return stamps[0] is not None and stamps[0] == stamps[1]
+        dics = [old.to_dict() if not isinstance(old, dict) else old, value]
+        for i, dic in enumerate(dics):
+            dics[i] = {name: item.isoformat()
+                       if isinstance(item, datetime) else item
+                       for name, item in dic.items()}
+        return dics[0] == dics[1]
+
+    def __sync(self, key, value, compare, report):
+        """ brings the object of key up to date with the stored dictionary
+           value, in place, reporting it as added or changed """
+        op = FileStorage.__pending.get(key)
+        if op == "delete":
+            return
+        raw = FileStorage.__raw
+        if op is None and key in raw:
+            if not self.__same(raw.get(key), value, compare):
+                self.__remember(key)
+                raw.add(key, value)
+                FileStorage.__fragments.pop(key, None)
+                FileStorage.__clean.discard(key.partition(".")[0])
+                report["changed"].append(key)
+            return
+        self.__build(key)
+        obj = FileStorage.__objects.get(key)
+        if obj is None:
+            self.__remember(key)
+            if self.lazy:
+                FileStorage.__raw.add(key, value)
+            else:
+                self.__put(key, self.__decode(value))
+            report["added"].append(key)
+            return
+        names = FileStorage.__dirty.get(key, ())
+        if names is None and op is not None:
+            return
+        if self.__same(obj, value, compare):
+            return
+        attrs = self.__decode(value).__dict__
+        for name in names:
+            if name in obj.__dict__:
+                attrs[name] = obj.__dict__[name]
+            else:
+                attrs.pop(name, None)
+        self.__remember(key)
+        obj.__dict__.clear()
+        obj.__dict__.update(attrs)
+        FileStorage.__fragments.pop(key, None)
+        FileStorage.__clean.discard(key.partition(".")[0])
+        self.__used(key, obj)
+        report["changed"].append(key)
+
+    def __load(self):
+        """ reads the JSON file and replays the journal into __objects """
+        shards = self.__shards() if self.sharded else []
+        if shards:
+            self.__load_shards(shards)
+        elif (os.path.isfile(FileStorage.__file_path) and
+                not (self.snapshot_cache and self.__load_cache())):
+            loaded = None
+            if ((self.reload_workers or 1) > 1 and
+                    self.__sniff(FileStorage.__file_path) is None and
+                    os.path.getsize(FileStorage.__file_path) >=
+                    self.parallel_min_size):
+                try:
+                    loaded = self.__parse(chain.from_iterable(iter_records(
+                        FileStorage.__file_path, self.reload_workers)))
+                except (ValueError, OSError, BrokenProcessPool):
+                    loaded = None
+            if loaded is None:
+                with self.__open_json(FileStorage.__file_path, 'r') as fl:
+                    loaded = self.__parse(self.__salvage(
+                        iter_items(fl), FileStorage.__file_path))
+            if self.progress is not None:
+                self.progress(len(loaded))
+            if self.snapshot_cache and not self.lazy:
+                FileStorage.__cache.write(FileStorage.__file_path, loaded,
+                                          self.__put_in_place)
+        if os.path.isfile(self.__log_path()):
+            self.__replay()
+        FileStorage.__pending.clear()
+        FileStorage.__dirty.clear()
+
+    def __load_shards(self, names):
+        """ reads the shard files of the class names and builds their
+           objects """
+        held = {name for name, objs in self.__partitions().items() if objs}
+        held.update(FileStorage.__raw.names())
+        loaded = self.__parse(chain.from_iterable(
+            self.__read_shard(self.__shard_path(name)) for name in names))
+        if self.progress is not None:
+            self.progress(len(loaded))
+        FileStorage.__clean = set(classes) - held
+
+    def __read_shard(self, path):
+        """ returns the (key, value) entries of the shard file path """
+        with self.__open_json(path, 'r') as fl:
+            return list(self.__salvage(iter_items(fl), path))
+
+    @staticmethod
+    def __salvage(entries, path):
+        """ yields the entries read from the file path; when the file ends
+           inside an entry, it stops after the complete ones, copies the
+           damaged file to path.corrupt and warns, so a save cut off by a
+           crash does not keep the storage from loading """
+        try:
+            yield from entries
+        except TruncatedError as err:
+            shutil.copyfile(path, path + ".corrupt")
+            warnings.warn("{} is cut short ({}); loaded the entries before "
+                          "the cut and kept a copy as {}.corrupt".format(
+                              path, err, path), RuntimeWarning)
+
+    def __parse(self, entries):
+        """ builds and stores the object of every (key, value) entry read
+           from the JSON file, or only keeps the entry when lazy is set,
+           returns them by key """
+        loaded = {}
+        self.__partitions()
+        for key, value in entries:
+            self.__remember(key)
+            if self.lazy:
+                if key in FileStorage.__objects:
+                    self.__drop(key)
+                FileStorage.__fragments.pop(key, None)
+                FileStorage.__raw.add(key, value)
+                loaded[key] = value
+            else:
+                obj = self.__decode(value)
+                self.__put(key, obj)
+                loaded[key] = obj
+            if (self.progress is not None and
+                    len(loaded) % self.progress_every == 0):
+                self.progress(len(loaded))
+        return loaded
+
+    def __start_flusher(self):
+        """ starts the background flusher unless it is running """
+        if FileStorage.__flusher is None:
+            flusher = threading.Thread(target=self.__run_flusher,
+                                       name="FileStorage flusher",
+                                       daemon=True)
+            FileStorage.__flusher = flusher
+            atexit.unregister(self.close)
+            atexit.register(self.close)
+            flusher.start()
+
+    def __run_flusher(self):
+        """ body of the background flusher: writes the waiting saves every
+           flush_interval seconds, or once flush_max_pending pile up """
+        me = threading.current_thread()
+        with FileStorage.__lock:
+            while FileStorage.__flusher is me:
+                FileStorage.__wakeup.wait_for(
+                    lambda: (FileStorage.__flusher is not me or
+                             (FileStorage.__txn is None and
+                              FileStorage.__unflushed >=
+                              self.flush_max_pending)),
+                    timeout=self.flush_interval)
+                if FileStorage.__unflushed and FileStorage.__txn is None:
+                    self.flush()
+
+    def __bgsave_path(self):
+        """ path the forked child writes its snapshot to """
+        return FileStorage.__file_path + ".bgsave"
+
+    def __reap(self, wait=False):
+        """ collects the background snapshot child once it exited, putting
+           its file in place and dropping the journal records it covers """
+        bg = FileStorage.__bgsave
+        if bg is None or not bg["pid"]:
+            return
+        pid, status = os.waitpid(bg["pid"], 0 if wait else os.WNOHANG)
+        if pid == 0:
+            return
+        bg["pid"] = None
+        bg["finished"] = time.time()
+        if os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0:
+            bg["state"] = "done"
+        else:
+            bg["state"] = "failed"
+        if (bg["state"] == "done" and
+                bg["snapshots"] == FileStorage.__snapshots):
+            self.__put_in_place(self.__bgsave_path(),
+                                FileStorage.__file_path)
+            FileStorage.__snapshots += 1
+            if os.path.isfile(self.__log_path()):
+                self.__trim_log(bg["offset"])
+        elif os.path.isfile(self.__bgsave_path()):
+            os.remove(self.__bgsave_path())
+
+    def __trim_log(self, offset):
+        """ drops the first offset bytes of the journal """
+        tmp = self.__log_path() + ".tmp"
+        with open(self.__log_path(), 'rb') as src, open(tmp, 'wb') as dst:
+            src.seek(offset)
+            shutil.copyfileobj(src, dst)
+        self.__put_in_place(tmp, self.__log_path())
+
+    def __outside(self, what):
+        """ raises RuntimeError if a transaction is open, as what would
+           write its uncommitted changes """
+        if FileStorage.__txn is not None:
+            raise RuntimeError("cannot {} inside a transaction".format(what))
+
+    def __end(self):
+        """ closes the open transaction and returns it """
+        txn = FileStorage.__txn
+        if txn is None:
+            raise RuntimeError("no transaction is open")
+        FileStorage.__txn = None
+        return txn
+
+    def __capture(self, key):
+        """ remembers the object under key before a change inside an open
+           transaction """
+        if FileStorage.__txn is not None:
+            FileStorage.__txn.capture(key, FileStorage.__objects.get(key))
+
+    @staticmethod
+    def __name(cls):
+        """ class name of cls, which may be a class or its name """
+        return cls if isinstance(cls, str) else cls.__name__
+
+    def __partitions(self):
+        """ returns the per-class partitions of __objects, rebuilding them
+           when __objects was replaced or changed behind our back """
+        parts = FileStorage.__classes
+        if (FileStorage.__indexed is not FileStorage.__objects or
+                sum(map(len, parts.values())) != len(FileStorage.__objects)):
+            parts = FileStorage.__classes = {}
+            for key, obj in FileStorage.__objects.items():
+                parts.setdefault(key.partition(".")[0], {})[key] = obj
+            if FileStorage.__indexed is not FileStorage.__objects:
+                FileStorage.__raw = LazyRecords()
+                FileStorage.__spill.reset()
+            FileStorage.__indexed = FileStorage.__objects
+            FileStorage.__clean = set()
+        return parts
+
+    def __build(self, key):
+        """ builds the object of key if its record was not built yet,
+           tells if it did """
+        value = FileStorage.__raw.pop(key)
+        if value is not None:
+            obj = self.__decode(value)
+        else:
+            frag = FileStorage.__spill.take(key)
+            if frag is None:
+                return False
+            obj = FileStorage.__spill.evicted.pop(key, None)
+            if obj is None:
+                value = json.loads(frag)
+                obj = self.__decode(value)
+            if self.fragment_cache:
+                FileStorage.__fragments[key] = frag
+            FileStorage.__spill.stats["misses"] += 1
+        FileStorage.__objects[key] = obj
+        self.__partitions().setdefault(key.partition(".")[0], {})[key] = obj
+        self.__used(key, obj)
+        return True
+
+    def __build_class(self, name):
+        """ builds every object of class name not built yet """
+        for key in list(chain(FileStorage.__raw.keys(name),
+                              FileStorage.__spill.keys(name))):
+            self.__build(key)
+
+    def __budget(self):
+        """ tells if a memory budget is set """
+        return self.max_objects is not None or self.max_bytes is not None
+
+    def __size(self, obj):
+        """ approximate size in bytes of obj and its attributes, counted
+           only when max_bytes is set """
+        if self.max_bytes is None:
+            return 0
+        return (sys.getsizeof(obj) + sys.getsizeof(obj.__dict__) +
+                sum(map(sys.getsizeof, obj.__dict__.values())))
+
+    def __used(self, key, obj):
+        """ marks obj, stored under key, as the most recently used """
+        if not self.__budget():
+            return
+        FileStorage.__spill.used(key, self.__size(obj))
+
+    def __over(self):
+        """ tells if the objects in memory are over the budget """
+        return ((self.max_objects is not None and
+                 len(FileStorage.__objects) > self.max_objects) or
+                (self.max_bytes is not None and
+                 FileStorage.__spill.resident > self.max_bytes))
+
+    def __evict(self):
+        """ spills the least recently used objects without unsaved
+           changes until the objects in memory fit in the budget """
+        if not self.__budget() or not self.__over():
+            return
+        spill = FileStorage.__spill
+        spill.track(FileStorage.__objects, self.__size)
+        txn = FileStorage.__txn
+        for key in list(spill.recent):
+            if not self.__over():
+                break
+            if (key in FileStorage.__pending or
+                    (txn is not None and key in txn.before)):
+                continue
+            self.__spill_out(key)
+
+    def __spill_path(self, pid=None):
+        """ path of the dbm file the evicted objects of the process pid,
+           this one by default, are spilled to """
+        return "{}.spill-{}".format(FileStorage.__file_path,
+                                    os.getpid() if pid is None else pid)
+
+    def __spill_out(self, key):
+        """ moves the object of key from memory to the spill file """
+        obj = FileStorage.__objects.pop(key)
+        self.__partitions().get(key.partition(".")[0], {}).pop(key, None)
+        frag = FileStorage.__fragments.pop(key, None)
+        if frag is None:
+            frag = json.dumps(self.__encode(obj))
+        FileStorage.__spill.put(self.__spill_path(), key, frag, obj)
+
+    def __put(self, key, obj):
+        """ stores obj under key in __objects and in its class partition;
+           the caller remembers the state of key first when that is a
+           change open snapshots must not see """
+        parts = self.__partitions()
+        FileStorage.__objects[key] = obj
+        parts.setdefault(key.partition(".")[0], {})[key] = obj
+        FileStorage.__fragments.pop(key, None)
+        FileStorage.__clean.discard(key.partition(".")[0])
+        FileStorage.__raw.pop(key)
+        FileStorage.__spill.take(key)
+        FileStorage.__spill.evicted.pop(key, None)
+        self.__used(key, obj)
+
+    def __mark(self, obj, name):
+        """ records a change to attribute name of obj, or to all of it
+           when name is None, and returns its key; returns None when obj
+           is not the stored object of its key """
+        key = obj.__class__.__name__ + "." + str(obj.__dict__.get("id"))
+        if (FileStorage.__spill and key in FileStorage.__spill and
+                FileStorage.__spill.evicted.get(key) is obj):
+            self.__build(key)
+        if FileStorage.__objects.get(key) is not obj:
+            return None
+        self.__capture(key)
+        self.__remember(key)
+        FileStorage.__fragments.pop(key, None)
+        if name is None:
+            FileStorage.__dirty[key] = None
+        elif FileStorage.__dirty.get(key, ()) is not None:
+            FileStorage.__dirty.setdefault(key, set()).add(name)
+        FileStorage.__pending.setdefault(key, "update")
+        FileStorage.__clean.discard(obj.__class__.__name__)
+        return key
+
+    def __drop(self, key):
+        """ removes key from __objects and from its class partition; the
+           caller remembers the state of key first like for __put() """
+        parts = self.__partitions()
+        parts.get(key.partition(".")[0], {}).pop(key, None)
+        FileStorage.__fragments.pop(key, None)
+        FileStorage.__dirty.pop(key, None)
+        FileStorage.__clean.discard(key.partition(".")[0])
+        FileStorage.__raw.pop(key)
+        FileStorage.__spill.take(key)
+        FileStorage.__spill.evicted.pop(key, None)
+        FileStorage.__spill.forget(key)
+        return FileStorage.__objects.pop(key, None)
+
+    def __log_path(self):
+        """ path of the journal kept next to the JSON file """
+        return FileStorage.__file_path + ".log"
+
+    def __write_snapshot(self):
+        """ rewrites the whole JSON file, or the changed shards, and drops
+           the journal it covers """
+        self.__partitions()
+        with FileStorage.__lock.downgraded():
+            if self.sharded:
+                self.__write_shards()
+            else:
+                self.__replace(FileStorage.__file_path)
+        FileStorage.__snapshots += 1
+        if os.path.isfile(self.__log_path()):
+            os.remove(self.__log_path())
+        FileStorage.__pending.clear()
+        FileStorage.__dirty.clear()
+
+    def __replace(self, path, name=None):
+        """ writes the objects of class name, or every object, to a
+           temporary file renamed over path once complete, removing it if
+           the write fails """
+        tmp = path + ".tmp"
+        try:
+            self.__write_file(tmp, name)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.__put_in_place(tmp, path)
+
+    @staticmethod
+    def __put_in_place(tmp, path):
+        """ renames the complete file tmp over path, syncing tmp to disk
+           first and the directory after, so a crash leaves either the
+           old file or the new one whole """
+        fd = os.open(tmp, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+        try:
+            fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def __shard_path(self, name):
+        """ path of the shard file of class name """
+        root, ext = os.path.splitext(FileStorage.__file_path)
+        return root + "." + name + (ext or ".json")
+
+    def __shards(self):
+        """ names of the classes that have a shard file """
+        return [name for name in classes
+                if os.path.isfile(self.__shard_path(name))]
+
+    def __write_shards(self):
+        """ rewrites the shard of every class changed since its shard was
+           last written; the first time, every shard is written and the
+           JSON file they replace is removed """
+        parts = self.__partitions()
+        names = set(parts).union(self.__shards(), FileStorage.__raw.names(),
+                                 FileStorage.__spill.names())
+        unsharded = os.path.isfile(FileStorage.__file_path)
+        if not unsharded:
+            names -= FileStorage.__clean
+        for name in sorted(names):
+            self.__replace(self.__shard_path(name), name)
+        FileStorage.__clean.update(names)
+        if unsharded:
+            os.remove(FileStorage.__file_path)
+
+    def __blob_path(self):
+        """ path of the blob file kept next to the JSON file """
+        return FileStorage.__file_path + ".blobs"
+
+    def __encode(self, obj):
+        """ to_dict() of obj, with the strings of at least blob_threshold
+           characters moved to the blob file and replaced in the dictionary
+           by their reference, and in obj by a BlobRef """
+        if self.blob_threshold is None:
+            return obj.to_dict()
+        store = BlobStore.open(self.__blob_path())
+        attrs = obj.__dict__
+        dic = attrs.copy()
+        for name, value in dic.items():
+            if (type(value) is str and len(value) >= self.blob_threshold and
+                    name not in _inline):
+                install(obj.__class__, name)
+                value = attrs[name] = BlobRef(store.path, store.put(value))
+            if type(value) is BlobRef:
+                dic[name] = {"__blob__": value.ref}
+        dic['__class__'] = obj.__class__.__name__
+        dic['created_at'] = obj.created_at.isoformat()
+        dic['updated_at'] = obj.updated_at.isoformat()
+        return dic
+
+    def __compact_blobs(self):
+        """ rewrites the blob file without the blobs that no object, record
+           not built yet, spilled object or state kept for a snapshot
+           refers to; not while a forked child may still add blobs """
+        if (self.shared or not os.path.isfile(self.__blob_path()) or
+                (FileStorage.__bgsave and FileStorage.__bgsave["pid"])):
+            return
+        spill = FileStorage.__spill
+        states = chain(
+            FileStorage.__objects.values(),
+            (value for key, value in FileStorage.__raw.items()),
+            (spill.read(key) for key in spill.keys()),
+            (state for kept in FileStorage.__versions.history.values()
+             for change, state in kept))
+        keep = set()
+        for state in states:
+            if isinstance(state, str):
+                keep.update(_blob_refs.findall(state))
+                continue
+            attrs = state if isinstance(state, dict) else state.__dict__
+            for value in attrs.values():
+                if type(value) is BlobRef:
+                    keep.add(value.ref)
+                elif (type(value) is dict and len(value) == 1 and
+                        "__blob__" in value):
+                    keep.add(value["__blob__"])
+        BlobStore.open(self.__blob_path()).compact(keep)
+
+    def __decode(self, value):
+        """ builds the object of a stored dictionary, leaving a BlobRef
+           for every attribute kept in the blob file """
+        return self.__unblob(classes[value['__class__']].from_dict(value))
+
+    def __unblob(self, obj):
+        """ replaces the blob references in obj by BlobRefs, returns obj """
+        attrs = obj.__dict__
+        for name, value in attrs.items():
+            if type(value) is dict and len(value) == 1 and "__blob__" in value:
+                install(obj.__class__, name)
+                attrs[name] = BlobRef(self.__blob_path(), value["__blob__"])
+        return obj
+
+    @staticmethod
+    def __sniff(path):
+        """ name of the compressor the file at path was written with, or
+           None for plain JSON """
+        with open(path, 'rb') as fl:
+            head = fl.read(6)
+        for magic, name in _magics:
+            if head.startswith(magic):
+                return name
+        return None
+
+    def __open_json(self, path, mode):
+        """ opens the JSON file path as text for mode 'r' or 'w', through
+           the compressor it was written with or is to be written with """
+        if mode == 'r':
+            name = self.__sniff(path)
+        else:
+            name = self.compression or _extensions.get(
+                os.path.splitext(FileStorage.__file_path)[1])
+        if name is None:
+            return open(path, mode, encoding='utf-8')
+        if name not in _codecs:
+            raise ValueError("unknown compression {!r}".format(name))
+        kwargs = {}
+        if self.compression_level is not None and mode == 'w':
+            key = "preset" if name == "lzma" else "compresslevel"
+            kwargs[key] = self.compression_level
+        return _codecs[name].open(path, mode + 't', encoding='utf-8',
+                                  **kwargs)
+
+    def __load_cache(self):
+        """ puts the cached objects in __objects if the cache was made from
+           the JSON file as it is now, tells if it did """
+        objects = FileStorage.__cache.load(FileStorage.__file_path)
+        if objects is None:
+            return False
+        for key, obj in objects.items():
+            self.__remember(key)
+            self.__put(key, obj)
+        if self.progress is not None:
+            self.progress(len(objects))
+        return True
+
+    def __write_file(self, path, name=None):
+        """ writes the objects of class name, or every object, to the JSON
+           file path, encoding only the objects without a cached fragment
+           and the records not built yet as they were read; spilled
+           objects are copied from the spill file """
+        fragments = FileStorage.__fragments
+        if not self.fragment_cache:
+            fragments.clear()
+        if name is None:
+            objects = FileStorage.__objects
+        else:
+            objects = self.__partitions().get(name, {})
+        raw = FileStorage.__raw.items(name)
+        spill = FileStorage.__spill
+        spilled = ((key, spill.read(key)) for key in spill.keys(name))
+        built = ((key, obj) for key in list(objects)
+                 for obj in (objects.get(key),) if obj is not None)
+        with self.__open_json(path, 'w') as fl:
+            sep = "{"
+            for key, obj in chain(built, raw, spilled):
+                frag = fragments.get(key)
+                if frag is None and isinstance(obj, str):
+                    frag = obj
+                elif frag is None:
+                    if isinstance(obj, dict):
+                        frag = json.dumps(obj, default=datetime.isoformat)
+                    else:
+                        frag = json.dumps(self.__encode(obj))
+                    if self.fragment_cache:
+                        fragments[key] = frag
+                fl.write(sep + json.dumps(key) + ": " + frag)
+                sep = ", "
+            fl.write("{}" if sep == "{" else "}")
+
+    def __replay(self):
+        """ applies the journal records on top of the loaded snapshot,
+           cutting off a torn record left by an interrupted append """
+        good = 0
+        with open(self.__log_path(), 'rb+') as fl:
+            for line in iter(fl.readline, b""):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self.__apply(record)
+                good = fl.tell()
+            fl.truncate(good)
+
+    def __apply(self, record):
+        """ applies a single journal record to __objects """
+        key = record["key"]
+        if record["op"] == "delete":
+            self.__remember(key)
+            self.__drop(key)
+        elif record["op"] == "create":
+            value = record["data"]
+            self.__remember(key)
+            self.__put(key, self.__decode(value))
+        elif self.__build(key) or key in FileStorage.__objects:
+            obj = FileStorage.__objects[key]
+            self.__remember(key)
+            FileStorage.__fragments.pop(key, None)
+            FileStorage.__clean.discard(key.partition(".")[0])
+            for name, value in record["data"].items():
+                if name == '__class__':
+                    continue
+                elif name == 'updated_at' or name == 'created_at':
+                    value = datetime.fromisoformat(value)
+                obj.__dict__[name] = value
+            self.__unblob(obj)
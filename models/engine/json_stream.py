@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+# reads the top-level object of a JSON file one entry at a time
+import json
+import re
+
+_ws = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+# what may be left of a number or a literal cut off by the end of the
+# text read so far, and of a \uXXXX escape
+_partial = re.compile(r'[-+.eE\d]*|t(?:r(?:ue?)?)?|f(?:a(?:l(?:se?)?)?)?|'
+                      r'n(?:u(?:ll?)?)?')
+_partial_escape = re.compile(r'u[0-9a-fA-F]{0,4}')
+
+
+class TruncatedError(ValueError):
+    """ raised by iter_items when the file ends inside an entry, once the
+       complete entries before it were yielded """
+
+
+def _cut_off(buf, err):
+    """ tells if the decode error err in buf is at its end, so it may
+       only be missing the rest of the text """
+    if err.msg.startswith("Unterminated string"):
+        return True
+    if err.msg.startswith("Invalid \\uXXXX escape"):
+        return _partial_escape.fullmatch(buf, err.pos) is not None
+    return _partial.fullmatch(buf, err.pos) is not None
+
+
+def iter_items(fl, size=1 << 16):
+    """ yields the (key, value) pairs of the JSON object stored in the
+       text file fl one at a time, reading it size characters at a time
+
+       only the entry being decoded is held in memory; a value that
+       does not decode raises ValueError like json.load would as soon
+       as it is read, and a file that ends inside an entry raises
+       TruncatedError after the entries before it, so a damaged file is
+       never taken for a smaller one """
+    buf = ""
+    pos = 0
+    eof = False
+    step = "{"
+    while True:
+        pos = _ws.match(buf, pos).end()
+        if pos < len(buf):
+            char = buf[pos]
+            if char == "}" and step in ("key", ","):
+                return
+            if step in ("{", ":", ","):
+                if char != step:
+                    raise ValueError(
+                        "unexpected {!r} in JSON object".format(char))
+                pos += 1
+                step = "value" if step == ":" else "key"
+                continue
+            try:
+                value, end = _decoder.raw_decode(buf, pos)
+            except ValueError as err:
+                if not _cut_off(buf, err):
+                    raise
+                if eof:
+                    raise TruncatedError(
+                        "JSON object cut short: {}".format(err)) from err
+                end = None
+            if end is not None and (eof or not _partial.fullmatch(buf, end)):
+                pos = end
+                if step == "key":
+                    key = value
+                    step = ":"
+                else:
+                    yield key, value
+                    step = ","
+                continue
+        if eof:
+            if step == "{":
+                return
+            raise TruncatedError("JSON object cut short")
+        chunk = fl.read(size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
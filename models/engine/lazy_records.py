@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+# the records a lazy reload keeps until their objects are asked for
+from itertools import chain
+
+
+class LazyRecords:
+    """ class LazyRecords that keeps the decoded records read with lazy
+       set, by class name, until their objects are built: get() builds
+       one object, by_class() the objects of one class and all() every
+       object left, while count() and saves of untouched records never
+       build them
+
+       records are opaque to it: the storage decides when one is built
+       and how, popping it from here first """
+
+    def __init__(self):
+        """ starts with no record kept """
+        self.__parts = {}
+
+    def __bool__(self):
+        """ tells if any record is kept """
+        return bool(self.__parts)
+
+    def __contains__(self, key):
+        """ tells if a record is kept for key """
+        return key in self.__parts.get(key.partition(".")[0], ())
+
+    def names(self):
+        """ the class names that have records kept """
+        return set(self.__parts)
+
+    def add(self, key, value):
+        """ keeps value as the record of key, replacing the one kept """
+        self.__parts.setdefault(key.partition(".")[0], {})[key] = value
+
+    def get(self, key):
+        """ the record kept for key, or None """
+        return self.__parts.get(key.partition(".")[0], {}).get(key)
+
+    def pop(self, key):
+        """ removes and returns the record kept for key, or None """
+        name = key.partition(".")[0]
+        part = self.__parts.get(name)
+        if part is None or key not in part:
+            return None
+        value = part.pop(key)
+        if not part:
+            del self.__parts[name]
+        return value
+
+    def items(self, name=None):
+        """ the (key, record) pairs of class name, or of every class """
+        if name is None:
+            return chain.from_iterable(
+                part.items() for part in self.__parts.values())
+        return self.__parts.get(name, {}).items()
+
+    def keys(self, name=None):
+        """ the keys of the records of class name, or of every class """
+        if name is None:
+            return chain.from_iterable(self.__parts.values())
+        return self.__parts.get(name, {}).keys()
+
+    def count(self, name=None):
+        """ the number of records of class name, or of every class """
+        if name is None:
+            return sum(map(len, self.__parts.values()))
+        return len(self.__parts.get(name, ()))
@@ -0,0 +1,383 @@
+#!/usr/bin/python3
+# a class that handles our storage in a log-structured merge tree
+import heapq
+import json
+import os
+import re
+import threading
+from bisect import bisect_right
+from models.engine.record_storage import RecordStorage
+
+_segment_name = re.compile(r'L(\d+)-(\d+)\.seg$')
+_wal_name = re.compile(r'wal-(\d+)\.log$')
+
+
+class _Segment:
+    """ an immutable file of [key, data] lines sorted by key, data None
+       being a tombstone, with a sparse index of every few keys kept in
+       memory and in a companion .idx file """
+
+    def __init__(self, path, level, seq, index=None):
+        """ opens the segment at path, reading its index """
+        self.path = path
+        self.level = level
+        self.seq = seq
+        if index is None:
+            try:
+                with open(self.index_path(), 'r', encoding='utf-8') as fl:
+                    index = json.load(fl)
+            except (OSError, ValueError):
+                index = self.__scan_index()
+        self.keys = [key for key, offset in index]
+        self.offsets = [offset for key, offset in index]
+
+    @classmethod
+    def write(cls, path, level, seq, items, every):
+        """ writes the (key, data) items, sorted by key, to a new segment
+           at path, indexing every every-th key, and returns it """
+        index = []
+        with open(path + ".tmp", 'wb') as fl:
+            for i, (key, data) in enumerate(items):
+                if i % every == 0:
+                    index.append([key, fl.tell()])
+                fl.write(json.dumps([key, data]).encode('utf-8') + b"\n")
+            fl.flush()
+            os.fsync(fl.fileno())
+        segment = cls(path, level, seq, index)
+        with open(segment.index_path() + ".tmp", 'w', encoding='utf-8') as fl:
+            json.dump(index, fl)
+        os.replace(segment.index_path() + ".tmp", segment.index_path())
+        os.replace(path + ".tmp", path)
+        return segment
+
+    def index_path(self):
+        """ path of the companion index file """
+        return self.path[:-len(".seg")] + ".idx"
+
+    def scan(self, lo=None, hi=None):
+        """ yields the (key, data) records with lo <= key < hi in order """
+        start = 0
+        if lo is not None:
+            i = bisect_right(self.keys, lo) - 1
+            if i >= 0:
+                start = self.offsets[i]
+        with open(self.path, 'rb') as fl:
+            fl.seek(start)
+            for line in fl:
+                key, data = json.loads(line)
+                if lo is not None and key < lo:
+                    continue
+                if hi is not None and key >= hi:
+                    return
+                yield key, data
+
+    def get(self, key):
+        """ returns (found, data) for key in this segment """
+        for found, data in self.scan(key):
+            return (found == key, data if found == key else None)
+        return (False, None)
+
+    def remove(self):
+        """ deletes the segment and its index """
+        for path in (self.path, self.index_path()):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def __scan_index(self):
+        """ rebuilds the sparse index of a segment without .idx file """
+        index = []
+        with open(self.path, 'rb') as fl:
+            for i, line in enumerate(iter(fl.readline, b"")):
+                if i % LSMStorage.index_every == 0:
+                    index.append([json.loads(line)[0],
+                                  fl.tell() - len(line)])
+        return index
+
+
+class LSMStorage(RecordStorage):
+    """ class LSMStorage that keeps instances in a log-structured merge
+       tree under the directory file.lsm
+
+       save() appends the changed objects to a write-ahead log and puts
+       them in the memtable; once it holds memtable_limit keys it is
+       frozen and a background thread writes it out as a segment file
+       sorted by key, so saves never rewrite old data. Deleting writes a
+       tombstone
+
+       reads look in the memtable, then the frozen memtables, then the
+       segments from newest to oldest, and class queries merge the key
+       ranges of all of them; as in the other engines only the objects
+       used are built
+
+       compaction is tiered: once tier_size segments sit on one level,
+       the background thread merges them into one segment on the next
+       level, dropping tombstones when nothing older is left below """
+    __dir_path = "file.lsm"
+    __lock = threading.RLock()
+    __opened = False
+    __memtable = {}
+    __seq = 0
+    __wal = None
+    __frozen = []
+    __segments = []
+    __worker = None
+    _objects = {}
+    _pending = {}
+    touched = "write"
+    memtable_limit = 10000
+    tier_size = 4
+    index_every = 64
+
+    def count(self, cls=None):
+        """ returns the number of objects of class cls, or of all objects
+           when cls is None; a pending write or delete only counts when it
+           creates or removes a live record """
+        name = None if cls is None else self._name(cls)
+        with LSMStorage.__lock:
+            total = self._count(name)
+            for key, op in LSMStorage._pending.items():
+                if name is None or key.partition(".")[0] == name:
+                    stored = self.__lookup(key) is not None
+                    if op == "write" and not stored:
+                        total += 1
+                    elif op == "delete" and stored:
+                        total -= 1
+            return total
+
+    def close(self):
+        """ waits for the background thread and closes the log, whose
+           records are written to a segment when the tree is reopened """
+        with LSMStorage.__lock:
+            worker = LSMStorage.__worker
+        if worker is not None:
+            worker.join()
+        with LSMStorage.__lock:
+            if LSMStorage.__wal is not None:
+                LSMStorage.__wal.close()
+                LSMStorage.__wal = None
+            LSMStorage.__opened = False
+            LSMStorage.__memtable = {}
+            LSMStorage.__frozen = []
+            LSMStorage.__segments = []
+
+    def _read(self, key):
+        """ the newest data of key, or None """
+        self.__open()
+        return self.__lookup(key)
+
+    def _records(self, name=None):
+        """ yields the live records of the class name, or of every class """
+        self.__open()
+        return self.__merged(name)
+
+    def _count(self, name=None):
+        """ the number of live records of the class name, or of all """
+        self.__open()
+        return sum(1 for record in self.__merged(name))
+
+    def _write(self, records):
+        """ writes the records to the log and the memtable """
+        self.__write(records)
+
+    def _reopen(self):
+        """ closes the tree and reads its segments and logs again """
+        self.close()
+        with LSMStorage.__lock:
+            self.__open()
+
+    def _decode(self, record):
+        """ the to_dict() dictionary of the data of a record """
+        return dict(record)
+
+    def _op(self, key):
+        """ new() records a write, without looking the key up """
+        return "write"
+
+    def _guard(self):
+        """ the lock of the tree """
+        return LSMStorage.__lock
+
+    def __path(self, name):
+        """ path of the file name in the tree's directory """
+        return os.path.join(LSMStorage.__dir_path, name)
+
+    def __wal_path(self, seq):
+        """ path of the log of the memtable numbered seq """
+        return self.__path("wal-{:08d}.log".format(seq))
+
+    def __segment_path(self, level, seq):
+        """ path of the segment numbered seq on level """
+        return self.__path("L{}-{:08d}.seg".format(level, seq))
+
+    def __open(self):
+        """ reads the segments and replays the logs the first time """
+        if LSMStorage.__opened:
+            return
+        os.makedirs(LSMStorage.__dir_path, exist_ok=True)
+        segments, wals = [], []
+        for name in os.listdir(LSMStorage.__dir_path):
+            match = _segment_name.match(name)
+            if match:
+                level, seq = int(match.group(1)), int(match.group(2))
+                segments.append(_Segment(self.__path(name), level, seq))
+            match = _wal_name.match(name)
+            if match:
+                wals.append(int(match.group(1)))
+        segments.sort(key=lambda segment: segment.seq, reverse=True)
+        LSMStorage.__segments = segments
+        LSMStorage.__frozen = []
+        flushed = {segment.seq for segment in segments if not segment.level}
+        for seq in sorted(wals):
+            table = {} if seq in flushed else self.__replay(seq)
+            if table:
+                LSMStorage.__frozen.append((seq, table))
+            else:
+                os.remove(self.__wal_path(seq))
+        LSMStorage.__seq = 1 + max([segment.seq for segment in segments] +
+                                   wals + [0])
+        LSMStorage.__memtable = {}
+        LSMStorage.__wal = open(self.__wal_path(LSMStorage.__seq), 'ab')
+        LSMStorage.__opened = True
+        if LSMStorage.__frozen:
+            self.__start_worker()
+
+    def __replay(self, seq):
+        """ returns the memtable held by the log numbered seq, cutting off
+           a torn record left by an interrupted append """
+        table = {}
+        good = 0
+        with open(self.__wal_path(seq), 'rb+') as fl:
+            for line in iter(fl.readline, b""):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    key, data = json.loads(line)
+                except ValueError:
+                    break
+                table[key] = data
+                good = fl.tell()
+            fl.truncate(good)
+        return table
+
+    def __write(self, records):
+        """ appends the (key, data) records to the log and the memtable,
+           freezing the memtable once it is full """
+        self.__open()
+        if not records:
+            return
+        LSMStorage.__wal.write(b"".join(
+            json.dumps([key, data]).encode('utf-8') + b"\n"
+            for key, data in records))
+        LSMStorage.__wal.flush()
+        LSMStorage.__memtable.update(records)
+        if len(LSMStorage.__memtable) >= self.memtable_limit:
+            LSMStorage.__frozen.append((LSMStorage.__seq,
+                                        LSMStorage.__memtable))
+            LSMStorage.__wal.close()
+            LSMStorage.__seq += 1
+            LSMStorage.__memtable = {}
+            LSMStorage.__wal = open(self.__wal_path(LSMStorage.__seq), 'ab')
+            self.__start_worker()
+
+    def __start_worker(self):
+        """ starts the background thread unless it is running """
+        if LSMStorage.__worker is None:
+            LSMStorage.__worker = threading.Thread(
+                target=self.__run_worker, name="LSMStorage worker",
+                daemon=True)
+            LSMStorage.__worker.start()
+
+    def __run_worker(self):
+        """ body of the background thread: writes the frozen memtables out
+           as segments, oldest first, and compacts after each one """
+        while True:
+            with LSMStorage.__lock:
+                if not LSMStorage.__frozen:
+                    LSMStorage.__worker = None
+                    return
+                seq, table = LSMStorage.__frozen[0]
+            segment = _Segment.write(self.__segment_path(0, seq), 0, seq,
+                                     sorted(table.items()), self.index_every)
+            with LSMStorage.__lock:
+                LSMStorage.__segments.insert(0, segment)
+                LSMStorage.__frozen.pop(0)
+                os.remove(self.__wal_path(seq))
+            self.__compact()
+
+    def __compact(self):
+        """ merges the segments of every level holding tier_size of them
+           into one segment on the next level """
+        while True:
+            with LSMStorage.__lock:
+                levels = [segment.level for segment in LSMStorage.__segments]
+                full = [level for level in set(levels)
+                        if levels.count(level) >= self.tier_size]
+                if not full:
+                    return
+                level = min(full)
+                inputs = [segment for segment in LSMStorage.__segments
+                          if segment.level == level]
+                bottom = max(levels) == level
+            records = self.__merge([segment.scan() for segment in inputs])
+            if bottom:
+                records = ((key, data) for key, data in records
+                           if data is not None)
+            output = _Segment.write(
+                self.__segment_path(level + 1, inputs[0].seq), level + 1,
+                inputs[0].seq, records, self.index_every)
+            with LSMStorage.__lock:
+                LSMStorage.__segments = sorted(
+                    [segment for segment in LSMStorage.__segments
+                     if segment not in inputs] + [output],
+                    key=lambda segment: segment.seq, reverse=True)
+            for segment in inputs:
+                segment.remove()
+
+    @staticmethod
+    def __merge(sources):
+        """ merges the sorted (key, data) iterables, newest first, into one
+           keeping only the newest record of every key """
+        def ranked(rank, source):
+            for key, data in source:
+                yield key, rank, data
+        last = None
+        for key, rank, data in heapq.merge(*[
+                ranked(rank, source) for rank, source in enumerate(sources)]):
+            if key != last:
+                last = key
+                yield key, data
+
+    @staticmethod
+    def __table_scan(table, lo, hi):
+        """ yields the records of a memtable with lo <= key < hi in order """
+        for key in sorted(key for key in table
+                          if lo is None or lo <= key < hi):
+            yield key, table[key]
+
+    def __merged(self, name=None):
+        """ yields the live (key, data) records of class name, or of every
+           class, merged from the memtables and the segments """
+        lo = hi = None
+        if name is not None:
+            lo, hi = name + ".", name + "/"
+        tables = [LSMStorage.__memtable] + [
+            table for seq, table in reversed(LSMStorage.__frozen)]
+        sources = [self.__table_scan(table, lo, hi) for table in tables]
+        sources += [segment.scan(lo, hi)
+                    for segment in LSMStorage.__segments]
+        for key, data in self.__merge(sources):
+            if data is not None:
+                yield key, data
+
+    def __lookup(self, key):
+        """ returns the newest data of key, or None """
+        tables = [LSMStorage.__memtable] + [
+            table for seq, table in reversed(LSMStorage.__frozen)]
+        for table in tables:
+            if key in table:
+                return table[key]
+        for segment in LSMStorage.__segments:
+            found, data = segment.get(key)
+            if found:
+                return data
+        return None
@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+# decodes the JSON file of FileStorage on a pool of processes
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# the end of one entry and the key of the next: '}, "Class.id": {'
+_boundary = re.compile(rb'\}\s*,\s*("(?:[^"\\]|\\.)*"\s*:\s*\{)')
+_opening = re.compile(rb'\s*\{\s*')
+
+
+def split(path, parts):
+    """ returns the (start, end) byte ranges of about parts equal slices
+       of the JSON object in path, each slice holding whole entries """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as fl:
+        opening = _opening.match(fl.read(64))
+        if opening is None:
+            raise ValueError("not a JSON object")
+        starts = [opening.end()]
+        for i in range(1, parts):
+            start = _find_boundary(fl, size * i // parts)
+            if start is None:
+                break
+            if start > starts[-1]:
+                starts.append(start)
+        fl.seek(max(size - 64, 0))
+        tail = fl.read()
+    end = size - len(tail) + tail.rindex(b"}")
+    if end <= starts[-1]:
+        starts.pop()
+    return list(zip(starts, starts[1:] + [end]))
+
+
+def _find_boundary(fl, pos):
+    """ offset of the first entry starting after pos, or None """
+    fl.seek(pos)
+    buf = b""
+    while True:
+        chunk = fl.read(1 << 16)
+        buf += chunk
+        match = _boundary.search(buf)
+        if match is not None:
+            return pos + match.start(1)
+        if not chunk:
+            return None
+
+
+def decode(path, start, end):
+    """ decodes the entries between start and end in path and returns
+       them as (key, attributes) records with the timestamps parsed,
+       raising ValueError on anything that is not a stored object """
+    with open(path, 'rb') as fl:
+        fl.seek(start)
+        text = fl.read(end - start).decode('utf-8')
+    records = []
+    for key, value in json.loads("{" + text.rstrip().rstrip(",") +
+                                 "}").items():
+        if (type(value) is not dict or
+                key.partition(".")[0] != value.get('__class__')):
+            raise ValueError("{} is not a stored object".format(key))
+        for name in ('created_at', 'updated_at'):
+            if type(value.get(name)) is str:
+                value[name] = datetime.fromisoformat(value[name])
+        records.append((key, value))
+    return records
+
+
+def iter_records(path, workers):
+    """ yields the records of the JSON file in path slice by slice, in
+       file order, decoded by workers forked processes """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        raise ValueError("parallel reload needs the fork start method")
+    ranges = split(path, workers * 4)
+    starts = [start for start, end in ranges]
+    ends = [end for start, end in ranges]
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        yield from pool.map(decode, [path] * len(ranges), starts, ends)
@@ -0,0 +1,247 @@
+#!/usr/bin/python3
+# the base of the storage engines that keep every instance as its own
+# record and only build the objects a process uses
+import json
+from contextlib import contextmanager, nullcontext
+from models.base_model import classes
+from models.engine.transaction import Transaction
+
+
+class RecordStorage:
+    """ class RecordStorage that implements new(), delete(), get(),
+       count(), by_class(), all(), copy(), save(), reload(), touch(), changed()
+       and the transactions for the engines keeping one record per
+       instance, keyed by Class.id, of which only the objects used by
+       this process are built; between begin() and commit() saves are
+       deferred and done once at commit, while rollback() undoes the
+       changes made in memory
+
+       an engine gives its dictionaries of the objects built or changed
+       in this process and of the writes the next save does, by key, as
+       the _objects and _pending class attributes, and reaches its
+       records through:
+           _read(key): the stored record of key, or None
+           _stored(key): tells if a record is stored for key
+           _records(name): yields the (key, record) pairs of the class
+               name, or of every class when name is None; a record may be
+               None, to be read with _read() only when it is built
+           _count(name): the number of records stored for the class
+               name, or for every class when name is None
+           _write(records): stores the (key, to_dict() dictionary)
+               records, deleting the keys whose dictionary is None
+           _reopen(): opens the records again, so what other processes
+               wrote is read
+       _decode() turns a record into its to_dict() dictionary, _op() is
+       the pending write new() records and touched the one touch()
+       records, and _guard() may return the lock every method holds """
+    _objects = None
+    _pending = None
+    _txn = None
+    touched = "update"
+
+    def all(self):
+        """ returns a dictionary containing all objects """
+        with self._guard():
+            for key, record in self._records():
+                self._load(key, record)
+            return type(self)._objects
+
+    def copy(self):
+        """ returns a copy of the dictionary all() returns, taken under
+           the lock, to iterate while other threads add or remove
+           objects """
+        with self._guard():
+            for key, record in self._records():
+                self._load(key, record)
+            return dict(type(self)._objects)
+
+    def new(self, obj):
+        """ adds obj to the objects to write on the next save """
+        key = obj.__class__.__name__ + "." + str(obj.id)
+        with self._guard():
+            objects, pending = type(self)._objects, type(self)._pending
+            if objects.get(key) is obj:
+                return
+            self._capture(key)
+            objects[key] = obj
+            if pending.get(key) != "create":
+                pending[key] = self._op(key)
+
+    def delete(self, obj=None):
+        """ removes obj, its record is deleted on the next save """
+        if obj is None:
+            return
+        key = obj.__class__.__name__ + "." + str(obj.id)
+        with self._guard():
+            objects, pending = type(self)._objects, type(self)._pending
+            if key not in objects:
+                return
+            self._capture(key)
+            del objects[key]
+            if pending.get(key) == "create":
+                del pending[key]
+            else:
+                pending[key] = "delete"
+
+    def get(self, cls, id):
+        """ returns the object of class cls with this id, or None """
+        with self._guard():
+            return self._load(self._name(cls) + "." + str(id))
+
+    def count(self, cls=None):
+        """ returns the number of objects of class cls, or of all objects
+           when cls is None """
+        name = None if cls is None else self._name(cls)
+        with self._guard():
+            total = self._count(name)
+            for key, op in type(self)._pending.items():
+                if name is None or key.partition(".")[0] == name:
+                    if op == "create":
+                        total += 1
+                    elif op == "delete":
+                        total -= 1
+            return total
+
+    def by_class(self, cls):
+        """ returns a dictionary containing only the objects of class cls """
+        name = self._name(cls)
+        with self._guard():
+            for key, record in self._records(name):
+                self._load(key, record)
+            return {key: obj for key, obj in type(self)._objects.items()
+                    if key.partition(".")[0] == name}
+
+    def save(self):
+        """ writes the records of the changed objects and deletes those of
+           the deleted ones """
+        with self._guard():
+            if self._deferred():
+                return
+            objects, pending = type(self)._objects, type(self)._pending
+            records = []
+            for key, op in pending.items():
+                if op == "delete":
+                    records.append((key, None))
+                elif key in objects:
+                    records.append((key, objects[key].to_dict()))
+            self._write(records)
+            pending.clear()
+
+    def reload(self):
+        """ reopens the records and forgets the objects without unsaved
+           changes so they are read again when used """
+        self._reopen()
+        with self._guard():
+            objects, pending = type(self)._objects, type(self)._pending
+            for key in [key for key in objects if key not in pending]:
+                del objects[key]
+
+    def touch(self, obj, name, value):
+        """ sets attribute name of obj to value and marks obj to be written
+           again on the next save """
+        with self._guard():
+            self.changed(obj)
+            object.__setattr__(obj, name, value)
+
+    def changed(self, obj):
+        """ marks obj to be written again on the next save; nothing is
+           done when obj is not stored """
+        key = obj.__class__.__name__ + "." + str(obj.__dict__.get("id"))
+        with self._guard():
+            if type(self)._objects.get(key) is obj:
+                self._capture(key)
+                type(self)._pending.setdefault(key, self.touched)
+
+    def begin(self):
+        """ opens a transaction, saves are deferred until commit() """
+        with self._guard():
+            if type(self)._txn is not None:
+                raise RuntimeError("a transaction is already open")
+            type(self)._txn = Transaction(dict(type(self)._pending))
+
+    def commit(self):
+        """ closes the transaction and does the saves it deferred """
+        with self._guard():
+            txn = self._end()
+            if txn.deferred:
+                self.save()
+
+    def rollback(self):
+        """ closes the transaction and undoes its changes in memory """
+        with self._guard():
+            txn = self._end()
+            objects, pending = type(self)._objects, type(self)._pending
+            txn.undo(objects.__setitem__, lambda key: objects.pop(key, None))
+            pending.clear()
+            pending.update(txn.saved)
+
+    def in_transaction(self):
+        """ tells if a transaction is open """
+        return type(self)._txn is not None
+
+    @contextmanager
+    def transaction(self):
+        """ runs the with block in a transaction, committed at the end of
+           the block or rolled back if it raises """
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    def _decode(self, record):
+        """ the to_dict() dictionary of a record read """
+        return json.loads(record)
+
+    def _op(self, key):
+        """ the pending write new() records for key """
+        return "update" if self._stored(key) else "create"
+
+    def _guard(self):
+        """ the lock held around the methods """
+        return nullcontext()
+
+    def _load(self, key, record=None):
+        """ returns the object of key, building it from its record the
+           first time, or None when it is neither built nor stored """
+        objects = type(self)._objects
+        if key in objects:
+            return objects[key]
+        if type(self)._pending.get(key) == "delete":
+            return None
+        if record is None:
+            record = self._read(key)
+            if record is None:
+                return None
+        obj = objects[key] = classes[key.partition(".")[0]].from_dict(
+            self._decode(record))
+        return obj
+
+    def _deferred(self):
+        """ tells if a transaction is open, marking its saves deferred """
+        txn = type(self)._txn
+        if txn is None:
+            return False
+        txn.deferred = True
+        return True
+
+    def _end(self):
+        """ closes the open transaction and returns it """
+        txn = type(self)._txn
+        if txn is None:
+            raise RuntimeError("no transaction is open")
+        type(self)._txn = None
+        return txn
+
+    def _capture(self, key):
+        """ remembers the object under key before a change inside an open
+           transaction """
+        if type(self)._txn is not None:
+            type(self)._txn.capture(key, type(self)._objects.get(key))
+
+    @staticmethod
+    def _name(cls):
+        """ class name of cls, which may be a class or its name """
+        return cls if isinstance(cls, str) else cls.__name__
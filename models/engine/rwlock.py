@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+# a reentrant reader-writer lock
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """ class RWLock that many threads may hold shared through reading()
+       while one at a time holds it exclusively through acquire() and
+       release(), or a with block; both ways are reentrant, the thread
+       holding it exclusively may also read, and writers waiting go
+       before new readers. It also works as the lock of a Condition
+
+       holding it exclusively is holding a threading.RLock, so a writer
+       alone only pays for that; readers take the RLock for a moment to
+       count themselves in, and a writer only waits on the count while
+       readers are in """
+
+    def __init__(self):
+        """ creates the lock, free """
+        self.__write = threading.RLock()
+        self.__cond = threading.Condition(threading.Lock())
+        self.__readers = {}
+        self.__reserved = None
+
+    def acquire(self, blocking=True, timeout=-1):
+        """ takes the lock exclusively, tells if it did """
+        if self.__write._is_owned():
+            if self.__reserved is not None:
+                raise RuntimeError("cannot take a read lock exclusively")
+            return self.__write.acquire()
+        if self.__readers and threading.get_ident() in self.__readers:
+            raise RuntimeError("cannot take a read lock exclusively")
+        if not self.__write.acquire(blocking, timeout):
+            return False
+        if self.__readers and not self.__drained(blocking, timeout):
+            self.__write.release()
+            return False
+        return True
+
+    def release(self):
+        """ gives back one exclusive hold of the lock """
+        self.__write.release()
+
+    def __enter__(self):
+        """ takes the lock exclusively, straight through the RLock when no
+           reader is in """
+        self.__write.acquire()
+        if self.__readers or self.__reserved is not None:
+            self.__write.release()
+            self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        """ gives the lock back """
+        self.__write.release()
+
+    @contextmanager
+    def reading(self):
+        """ holds the lock shared for the with block """
+        if self.__write._is_owned():
+            yield
+            return
+        me = threading.get_ident()
+        with self.__cond:
+            entered = me in self.__readers or self.__reserved is not None
+            if entered:
+                self.__readers[me] = self.__readers.get(me, 0) + 1
+        if not entered:
+            with self.__write:
+                with self.__cond:
+                    self.__readers[me] = 1
+        try:
+            yield
+        finally:
+            with self.__cond:
+                self.__readers[me] -= 1
+                if not self.__readers[me]:
+                    del self.__readers[me]
+                    self.__cond.notify_all()
+
+    @contextmanager
+    def downgraded(self):
+        """ turns the exclusive hold of this thread into a shared one for
+           the with block, so readers may go on meanwhile while writers
+           still wait, and takes it back exclusively after; when this
+           thread does not hold the lock exclusively it only reads """
+        if not self.__write._is_owned() or self.__reserved is not None:
+            with self.reading():
+                yield
+            return
+        with self.__cond:
+            self.__reserved = threading.get_ident()
+        try:
+            yield
+        finally:
+            with self.__cond:
+                self.__reserved = None
+                self.__cond.wait_for(lambda: not self.__readers)
+
+    def __drained(self, blocking, timeout):
+        """ waits, holding the RLock, until the readers are out, tells if
+           they are """
+        with self.__cond:
+            if not blocking:
+                return not self.__readers
+            return self.__cond.wait_for(lambda: not self.__readers,
+                                        None if timeout < 0 else timeout)
+
+    def _is_owned(self):
+        """ tells if this thread holds the lock exclusively, for Condition """
+        return self.__write._is_owned()
+
+    def _release_save(self):
+        """ gives back every exclusive hold of this thread, for Condition """
+        return self.__write._release_save()
+
+    def _acquire_restore(self, state):
+        """ takes back the holds given by _release_save, for Condition """
+        self.__write._acquire_restore(state)
+        if self.__readers:
+            self.__drained(True, -1)
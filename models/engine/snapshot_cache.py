@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+# a pickled copy of the objects read from the JSON file
+import hashlib
+import os
+import pickle
+
+
+class SnapshotCache:
+    """ class SnapshotCache that pickles the objects read from a JSON
+       file to a cache file next to it, keyed by the JSON file's size,
+       mtime and hash, so they can be unpickled instead of parsed while
+       the JSON file did not change
+
+       stat is the size and mtime of the JSON file the cache was last
+       loaded from or written for, None before either """
+
+    def __init__(self):
+        """ starts with no cache loaded or written """
+        self.stat = None
+
+    @staticmethod
+    def path(json_path):
+        """ path of the cache of the JSON file json_path """
+        return json_path + ".cache"
+
+    @staticmethod
+    def stamp(json_path):
+        """ size and mtime of the JSON file json_path """
+        st = os.stat(json_path)
+        return (st.st_size, st.st_mtime_ns)
+
+    @staticmethod
+    def __digest(json_path):
+        """ hash of the content of the JSON file json_path """
+        digest = hashlib.sha1()
+        with open(json_path, 'rb') as fl:
+            for chunk in iter(lambda: fl.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def current(self, json_path):
+        """ tells if the cache was loaded or written for the JSON file
+           json_path as it is now """
+        return self.stamp(json_path) == self.stat
+
+    def load(self, json_path):
+        """ returns the cached objects by key if the cache was made from
+           the JSON file json_path as it is now, or None """
+        try:
+            with open(self.path(json_path), 'rb') as fl:
+                stat, digest = pickle.load(fl)
+                if (stat != self.stamp(json_path) or
+                        digest != self.__digest(json_path)):
+                    return None
+                objects = pickle.load(fl)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        self.stat = stat
+        return objects
+
+    def write(self, json_path, objects, put_in_place):
+        """ pickles objects to the cache of the JSON file json_path through
+           a temporary file that put_in_place(tmp, path) renames over it """
+        stat = self.stamp(json_path)
+        tmp = self.path(json_path) + ".tmp"
+        with open(tmp, 'wb') as fl:
+            pickle.dump((stat, self.__digest(json_path)), fl,
+                        pickle.HIGHEST_PROTOCOL)
+            pickle.dump(objects, fl, pickle.HIGHEST_PROTOCOL)
+        put_in_place(tmp, self.path(json_path))
+        self.stat = stat
@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+# keeps the objects evicted under a memory budget in a dbm file
+import dbm
+import glob
+import os
+import weakref
+from collections import OrderedDict
+from itertools import chain
+
+
+class Spill:
+    """ class Spill that keeps the least recently used order of the
+       objects in memory, with their sizes, and the JSON of the objects
+       evicted from memory, by class name, in a dbm file the storage then
+       builds them again from; an evicted instance is remembered weakly
+       so the same one comes back while the program still holds it
+
+       every process spills to its own file, named after the JSON file
+       and its pid, and clear() removes the ones left by processes that
+       ended without closing the storage. Which objects to evict and when
+       is left to the storage """
+
+    def __init__(self):
+        """ starts with nothing spilled and no object in use """
+        self.db = None
+        self.evicted = weakref.WeakValueDictionary()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self.reset()
+
+    def reset(self):
+        """ forgets the spilled keys and the order of use, as when the
+           objects were replaced """
+        self.__parts = {}
+        self.recent = OrderedDict()
+        self.resident = 0
+
+    def __bool__(self):
+        """ tells if any object is spilled """
+        return bool(self.__parts)
+
+    def __contains__(self, key):
+        """ tells if the object of key is spilled """
+        return key in self.__parts.get(key.partition(".")[0], ())
+
+    def names(self):
+        """ the class names that have objects spilled """
+        return set(self.__parts)
+
+    def keys(self, name=None):
+        """ the spilled keys of class name, or of every class """
+        if name is None:
+            return chain.from_iterable(self.__parts.values())
+        return self.__parts.get(name, ())
+
+    def count(self, name=None):
+        """ the number of objects spilled of class name, or of every
+           class """
+        if name is None:
+            return sum(map(len, self.__parts.values()))
+        return len(self.__parts.get(name, ()))
+
+    def used(self, key, size):
+        """ marks the object of key, of about size bytes, as the most
+           recently used """
+        self.resident += size - self.recent.pop(key, 0)
+        self.recent[key] = size
+
+    def forget(self, key):
+        """ takes the object of key out of the order of use """
+        self.resident -= self.recent.pop(key, 0)
+
+    def track(self, objects, sizeof):
+        """ brings the order of use in line with objects, the dictionary
+           of the objects in memory, when their counts differ: keys gone
+           are dropped and objects not seen yet go first, as the least
+           recently used, sizeof giving their size """
+        recent = self.recent
+        if len(recent) == len(objects):
+            return
+        for key in [key for key in recent if key not in objects]:
+            self.resident -= recent.pop(key)
+        for key, obj in objects.items():
+            if key not in recent:
+                self.used(key, sizeof(obj))
+                recent.move_to_end(key, last=False)
+
+    def put(self, path, key, frag, obj):
+        """ spills obj, the object of key, as its JSON fragment frag to the
+           file path of this process, opening it the first time """
+        if self.db is None:
+            self.db = dbm.open(path, 'n')
+        self.forget(key)
+        self.db[key] = frag
+        self.__parts.setdefault(key.partition(".")[0], set()).add(key)
+        self.evicted[key] = obj
+        self.stats["evictions"] += 1
+
+    def read(self, key):
+        """ the JSON fragment spilled for key """
+        return self.db[key].decode('utf-8')
+
+    def take(self, key):
+        """ forgets that key is spilled, returns its JSON fragment or None
+           if it was not spilled """
+        name = key.partition(".")[0]
+        part = self.__parts.get(name)
+        if part is None or key not in part:
+            return None
+        part.discard(key)
+        if not part:
+            del self.__parts[name]
+        return self.read(key)
+
+    def close(self):
+        """ closes the file of this process once nothing is spilled """
+        if self.db is not None and not self.__parts:
+            self.db.close()
+            self.db = None
+
+    def clear(self, prefix):
+        """ removes the spill files named prefix followed by a pid: this
+           process' while it has none open, and those of processes that
+           ended """
+        for path in glob.glob(glob.escape(prefix) + "*"):
+            pid = path[len(prefix):].partition(".")[0]
+            if not pid.isdigit():
+                continue
+            if int(pid) == os.getpid():
+                if self.db is not None:
+                    continue
+            elif self.__alive(int(pid)):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def __alive(pid):
+        """ tells if the process pid may still be running """
+        if not hasattr(os, "fork"):
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True
+        return True
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+# a class that handles our storage in a sqlite database
+import json
+import sqlite3
+from models.engine.record_storage import RecordStorage
+
+
+class SQLiteStorage(RecordStorage):
+    """ class SQLiteStorage that keeps every instance as one row of a
+       sqlite table keyed by (class name, id)
+
+       only the objects used by this process are held in memory: save()
+       upserts and deletes the changed rows inside one transaction, and
+       class lookups are answered by the primary key index """
+    __db_path = "file.db"
+    __conn = None
+    _objects = {}
+    _pending = {}
+
+    def close(self):
+        """ closes the connection to the database """
+        if SQLiteStorage.__conn is not None:
+            SQLiteStorage.__conn.close()
+            SQLiteStorage.__conn = None
+
+    def _read(self, key):
+        """ the JSON of the row of key, or None """
+        name, _, id = key.partition(".")
+        for data, in self.__execute("SELECT data FROM objects "
+                                    "WHERE cls = ? AND id = ?", (name, id)):
+            return data
+        return None
+
+    def _stored(self, key):
+        """ tells if a row exists for key """
+        name, _, id = key.partition(".")
+        return self.__execute("SELECT 1 FROM objects WHERE cls = ? AND id = ?",
+                              (name, id)).fetchone() is not None
+
+    def _records(self, name=None):
+        """ yields the keys and JSON of the rows of the class name, or of
+           every row """
+        if name is None:
+            rows = self.__execute("SELECT cls, id, data FROM objects")
+        else:
+            rows = self.__execute("SELECT cls, id, data FROM objects "
+                                  "WHERE cls = ?", (name,))
+        for cls, id, data in rows:
+            yield cls + "." + id, data
+
+    def _count(self, name=None):
+        """ the number of rows of the class name, or of every row """
+        if name is None:
+            query, params = "SELECT COUNT(*) FROM objects", ()
+        else:
+            query = "SELECT COUNT(*) FROM objects WHERE cls = ?"
+            params = (name,)
+        return self.__execute(query, params).fetchone()[0]
+
+    def _write(self, records):
+        """ upserts and deletes the rows inside one transaction """
+        upserts, deletes = [], []
+        for key, value in records:
+            name, _, id = key.partition(".")
+            if value is None:
+                deletes.append((name, id))
+            else:
+                upserts.append((name, id, json.dumps(value)))
+        conn = self.__connect()
+        with conn:
+            conn.executemany("INSERT INTO objects (cls, id, data) "
+                             "VALUES (?, ?, ?) ON CONFLICT (cls, id) "
+                             "DO UPDATE SET data = excluded.data", upserts)
+            conn.executemany("DELETE FROM objects WHERE cls = ? AND id = ?",
+                             deletes)
+
+    def _reopen(self):
+        """ opens the database """
+        self.__connect()
+
+    def __connect(self):
+        """ returns the connection, opening it and creating the table
+           the first time """
+        if SQLiteStorage.__conn is None:
+            conn = sqlite3.connect(SQLiteStorage.__db_path)
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS objects ("
+                             "cls TEXT NOT NULL, id TEXT NOT NULL, "
+                             "data TEXT NOT NULL, PRIMARY KEY (cls, id)) "
+                             "WITHOUT ROWID")
+            SQLiteStorage.__conn = conn
+        return SQLiteStorage.__conn
+
+    def __execute(self, query, params=()):
+        """ runs a read query on the database """
+        return self.__connect().execute(query, params)
@@ -0,0 +1,38 @@
+#!/usr/bin/python3
+# the undo log shared by the storage engines for their transactions
+
+
+class Transaction:
+    """ class Transaction that remembers, for every key changed while it
+       is open, the object stored under it and that object's attributes
+       before the first change, so the changes can be undone in memory
+
+       saved is whatever bookkeeping the engine needs back on rollback
+       (its pending writes when the transaction began) """
+
+    def __init__(self, saved=None):
+        """ opens an empty transaction """
+        self.saved = saved
+        self.before = {}
+        self.deferred = False
+
+    def capture(self, key, obj):
+        """ remembers obj, the object currently stored under key or None,
+           unless key was already changed in this transaction """
+        if key not in self.before:
+            if obj is None:
+                self.before[key] = None
+            else:
+                self.before[key] = (obj, dict(obj.__dict__))
+
+    def undo(self, put, drop):
+        """ puts every captured key back the way it was, through the
+           engine's put(key, obj) and drop(key) functions """
+        for key, before in self.before.items():
+            if before is None:
+                drop(key)
+            else:
+                obj, attrs = before
+                obj.__dict__.clear()
+                obj.__dict__.update(attrs)
+                put(key, obj)
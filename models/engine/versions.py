@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+# the version chains behind the point-in-time snapshots of a storage
+import weakref
+from bisect import bisect_right
+from collections import Counter
+
+
+class Versions:
+    """ class Versions that keeps, while snapshots are open, the states
+       keys had before they changed, each with the version its change
+       made; a snapshot opened at version v sees under every key the
+       state of the first change after v, or the current one if there is
+       none, and states no open snapshot can see any more are dropped
+
+       states are opaque to it: the storage decides what it keeps for a
+       key and how a reader turns it back into an object, None standing
+       for no object under the key """
+
+    def __init__(self):
+        """ starts with no snapshot open and no state kept """
+        self.version = 0
+        self.readers = Counter()
+        self.history = {}
+
+    def open(self):
+        """ opens a snapshot of the current version, returns the version """
+        self.readers[self.version] += 1
+        return self.version
+
+    def close(self, version):
+        """ closes a snapshot opened at version and drops the states only
+           it could see """
+        self.readers[version] -= 1
+        if not self.readers[version]:
+            del self.readers[version]
+        if not self.readers:
+            self.history.clear()
+            return
+        opened = sorted(self.readers)
+        for key in list(self.history):
+            chain = self.history[key]
+            changes = [change for change, state in chain]
+            needed = {bisect_right(changes, version) for version in opened}
+            chain[:] = [chain[i] for i in sorted(needed) if i < len(chain)]
+            if not chain:
+                del self.history[key]
+
+    def remember(self, key, state):
+        """ keeps the state key has before a change, state() giving it,
+           unless no open snapshot needs it """
+        if not self.readers:
+            return
+        chain = self.history.get(key)
+        if chain and chain[-1][0] > max(self.readers):
+            return
+        self.version += 1
+        self.history.setdefault(key, []).append((self.version, state()))
+
+    def visible(self, key, version):
+        """ returns (True, state) with the state key had at version when
+           it changed since, or (False, None) when its current state is
+           the one to see """
+        chain = self.history.get(key)
+        if chain:
+            i = bisect_right([change for change, state in chain], version)
+            if i < len(chain):
+                return True, chain[i][1]
+        return False, None
+
+
+class Snapshot:
+    """ class Snapshot that reads a storage as it was when the snapshot was
+       opened, whatever is changed in it meanwhile; the objects it returns
+       are copies detached from the storage. Close it, or use it in a with
+       block, so the versions kept for it can be dropped
+
+       keys(version) returns the keys visible at version and read(keys,
+       version) their objects as (key, object) pairs; close(version)
+       closes the snapshot in the storage """
+    chunk = 1000
+
+    def __init__(self, version, keys, read, close):
+        """ opens the view of version of a storage """
+        self.version = version
+        self.__keys = keys
+        self.__read = read
+        self.__finalizer = weakref.finalize(self, close, version)
+
+    def __enter__(self):
+        """ the snapshot itself """
+        return self
+
+    def __exit__(self, *exc):
+        """ closes the snapshot """
+        self.close()
+
+    def close(self):
+        """ closes the snapshot, it cannot be read any more """
+        self.__finalizer()
+
+    @property
+    def closed(self):
+        """ tells if the snapshot was closed """
+        return not self.__finalizer.alive
+
+    def items(self, cls=None):
+        """ yields the (key, object) pairs of every object, or of the
+           objects of class cls, a chunk at a time """
+        keys = self.__visible(cls)
+        for start in range(0, len(keys), self.chunk):
+            yield from self.__read(keys[start:start + self.chunk],
+                                   self.version)
+
+    def all(self):
+        """ returns a dictionary of every object """
+        return dict(self.items())
+
+    def by_class(self, cls):
+        """ returns a dictionary of the objects of class cls """
+        return dict(self.items(cls))
+
+    def get(self, cls, id):
+        """ returns the object of class cls with this id, or None """
+        self.__check()
+        found = self.__read([self.__name(cls) + "." + str(id)],
+                            self.version)
+        return found[0][1] if found else None
+
+    def count(self, cls=None):
+        """ returns the number of objects, or of objects of class cls """
+        return len(self.__visible(cls))
+
+    def __visible(self, cls):
+        """ the keys of every object, or of the objects of class cls """
+        self.__check()
+        keys = self.__keys(self.version)
+        if cls is not None:
+            prefix = self.__name(cls) + "."
+            keys = [key for key in keys if key.startswith(prefix)]
+        return keys
+
+    def __check(self):
+        """ raises ValueError once the snapshot is closed """
+        if self.closed:
+            raise ValueError("the snapshot is closed")
+
+    @staticmethod
+    def __name(cls):
+        """ class name of cls, which may be a class or its name """
+        return cls if isinstance(cls, str) else cls.__name__
@@ -9,6 +9,8 @@
         TestHBNBCommand_update
         TestHBNBCommand_count
         TestHBNBCommand_all
+        TestHBNBCommand_transaction
+        TestHBNBCommand_bgsave
         TestHBNBCommand_hlp
         TestHBNBCommand_exit
 """
@@ -1483,6 +1485,107 @@ class TestHBNBCommand_all(unittest.TestCase):
             self.assertNotIn("BaseModel", output.getvalue().strip())
 
 
+class TestHBNBCommand_transaction(unittest.TestCase):
+    """Testing begin, commit and rollback from HBNB command interpreter."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+
+    def tearDown(self):
+        if storage.in_transaction():
+            storage.rollback()
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def test_commit_saves_once(self):
+        HBNBCommand().onecmd("begin")
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create User")
+            test_ID = output.getvalue().strip()
+        self.assertFalse(os.path.isfile("file.json"))
+        HBNBCommand().onecmd("commit")
+        with open("file.json", "r") as f:
+            self.assertIn("User." + test_ID, f.read())
+
+    def test_rollback_undoes_changes(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create User")
+            test_ID = output.getvalue().strip()
+        HBNBCommand().onecmd("begin")
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create State")
+            st_ID = output.getvalue().strip()
+        HBNBCommand().onecmd("update User {} first_name \"Betty\"".format(
+            test_ID))
+        HBNBCommand().onecmd("rollback")
+        self.assertNotIn("State." + st_ID, storage.all())
+        usr = storage.all()["User." + test_ID]
+        self.assertNotIn("first_name", usr.__dict__)
+
+    def test_no_transaction_open(self):
+        crct = "** no transaction open **"
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("commit"))
+            self.assertEqual(crct, output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("rollback"))
+            self.assertEqual(crct, output.getvalue().strip())
+
+    def test_transaction_already_open(self):
+        crct = "** transaction already open **"
+        HBNBCommand().onecmd("begin")
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("begin"))
+            self.assertEqual(crct, output.getvalue().strip())
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+class TestHBNBCommand_bgsave(unittest.TestCase):
+    """Testing bgsave from HBNB command interpreter."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+
+    def tearDown(self):
+        storage.close()
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def test_bgsave(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("bgsave"))
+            self.assertEqual("Background saving started",
+                             output.getvalue().strip())
+        storage.close()
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("bgsave status"))
+            self.assertTrue(output.getvalue().startswith("done in "))
+
+    def test_bgsave_unknown_option(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("bgsave now"))
+            self.assertEqual("** unknown option **",
+                             output.getvalue().strip())
+
+
 class TestHBNBCommand_exit(unittest.TestCase):
     """Testing exiting from HBNB command interpreter."""
 
@@ -5,13 +5,14 @@
         TestBaseModel_instantiation
         TestBaseModel_save
         TestBaseModel_to_dict
+        TestBaseModel_from_dict
 """
 import os
 import unittest
 import models
 from time import sleep
 from datetime import datetime
-from models.base_model import BaseModel
+from models.base_model import BaseModel, classes
 
 
 class TestBaseModel_instantiation(unittest.TestCase):
@@ -188,6 +189,52 @@ class TestBaseModel_to_dict(unittest.TestCase):
             base_m.to_dict(None)
 
 
+class TestBaseModel_from_dict(unittest.TestCase):
+    """Testing the model registry and from_dict of BaseModel class."""
+
+    def test_registry_has_all_models(self):
+        for name in ("BaseModel", "User", "State", "City", "Amenity",
+                     "Place", "Review"):
+            self.assertIn(name, classes)
+        self.assertIs(BaseModel, classes["BaseModel"])
+
+    def test_subclass_joins_registry(self):
+        class MyModel(BaseModel):
+            pass
+        try:
+            self.assertIs(MyModel, classes["MyModel"])
+        finally:
+            del classes["MyModel"]
+
+    def test_from_dict_round_trip(self):
+        base_m = BaseModel()
+        base_m.name = "ALXAfrica"
+        base_m.my_number = 98
+        copy = BaseModel.from_dict(base_m.to_dict())
+        self.assertIsNot(base_m, copy)
+        self.assertEqual(base_m.__dict__, copy.__dict__)
+        self.assertEqual(datetime, type(copy.created_at))
+
+    def test_from_dict_not_stored(self):
+        date_t = datetime.today().isoformat()
+        copy = BaseModel.from_dict({"id": "345", "created_at": date_t,
+                                    "updated_at": date_t,
+                                    "__class__": "BaseModel"})
+        self.assertNotIn(copy, models.storage.all().values())
+
+    def test_from_dict_matches_kwargs_init(self):
+        date_t = datetime.today().isoformat()
+        dic = {"id": "345", "created_at": date_t, "updated_at": date_t,
+               "name": "Betty", "__class__": "BaseModel"}
+        self.assertEqual(BaseModel(**dic).__dict__,
+                         BaseModel.from_dict(dic).__dict__)
+
+    def test_from_dict_without_class(self):
+        copy = BaseModel.from_dict({"id": "345", "name": "Betty"})
+        self.assertEqual("345", copy.id)
+        self.assertNotIn("__class__", copy.__dict__)
+
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+"""
+    The base of the unittests of the record storage engines.
+    Classes:
+        EngineTestCase
+"""
+import glob
+import os
+import shutil
+import unittest
+import models
+from models.base_model import BaseModel
+from models.user import User
+from models.state import State
+
+
+class EngineTestCase(unittest.TestCase):
+    """Base of the engine tests: points the engine class at a test path,
+    starts it with no object loaded and makes it models.storage, then
+    closes it, removes the files at the test path and puts everything
+    back. A subclass sets engine, the name of its private path attribute
+    as path_attr and the test path as path; the tests here run for each
+    engine."""
+    engine = None
+    path_attr = None
+    path = None
+
+    def setUp(self):
+        self.saved_path = getattr(self.engine, self.path_attr)
+        setattr(self.engine, self.path_attr, self.path)
+        self.engine._objects = {}
+        self.engine._pending = {}
+        self.storage = self.engine()
+        self.storage.reload()
+        self.saved = models.storage
+        models.storage = self.storage
+
+    def tearDown(self):
+        models.storage = self.saved
+        self.storage.close()
+        setattr(self.engine, self.path_attr, self.saved_path)
+        self.engine._objects = {}
+        self.engine._pending = {}
+        for name in glob.glob(self.path + "*"):
+            if os.path.isdir(name):
+                shutil.rmtree(name)
+            else:
+                os.remove(name)
+
+    def reopen(self):
+        """forgets every loaded object, as a new process would"""
+        self.storage.close()
+        self.engine._objects = {}
+        self.engine._pending = {}
+        self.storage.reload()
+
+    def test_save_and_get(self):
+        usr = User()
+        usr.first_name = "Betty"
+        usr.save()
+        self.reopen()
+        loaded = self.storage.get("User", usr.id)
+        self.assertIsNot(usr, loaded)
+        self.assertEqual(usr.to_dict(), loaded.to_dict())
+        self.assertIsNone(self.storage.get("User", "missing"))
+
+    def test_update_and_delete(self):
+        usr = User()
+        st_class = State()
+        self.storage.save()
+        usr.first_name = "Betty"
+        self.storage.delete(st_class)
+        self.storage.save()
+        self.reopen()
+        self.assertEqual("Betty",
+                         self.storage.get("User", usr.id).first_name)
+        self.assertIsNone(self.storage.get("State", st_class.id))
+        self.assertEqual(1, self.storage.count())
+
+    def test_save_writes_changes_in_place(self):
+        usr = User()
+        usr.tags = [1]
+        usr.first_name = "Betty"
+        usr.save()
+        self.reopen()
+        usr = self.storage.get("User", usr.id)
+        usr.tags.append(2)
+        usr.save()
+        self.reopen()
+        usr = self.storage.get("User", usr.id)
+        del usr.first_name
+        self.storage.save()
+        self.reopen()
+        usr = self.storage.get("User", usr.id)
+        self.assertEqual([1, 2], usr.tags)
+        self.assertNotIn("first_name", usr.__dict__)
+
+    def test_count_and_by_class(self):
+        User().save()
+        User()
+        st_class = State()
+        st_class.save()
+        self.reopen()
+        usr = User()
+        self.assertEqual(3, self.storage.count(User))
+        self.assertEqual(1, self.storage.count("State"))
+        self.assertEqual(4, self.storage.count())
+        states = self.storage.by_class("State")
+        self.assertEqual(["State." + st_class.id], list(states))
+        self.assertIn("User." + usr.id, self.storage.by_class(User))
+
+    def test_all_loads_every_record(self):
+        base_m = BaseModel()
+        usr = User()
+        self.storage.save()
+        self.reopen()
+        objcts = self.storage.all()
+        self.assertIn("BaseModel." + base_m.id, objcts)
+        self.assertIn("User." + usr.id, objcts)
+        self.assertEqual(objcts, self.storage.copy())
+        self.assertIsNot(objcts, self.storage.copy())
+
+    def test_transaction_rollback(self):
+        usr = User()
+        usr.save()
+        self.storage.begin()
+        usr.first_name = "Betty"
+        st_class = State()
+        self.storage.rollback()
+        self.assertNotIn("first_name", usr.__dict__)
+        self.assertIsNone(self.storage.get(State, st_class.id))
+        self.storage.save()
+        self.reopen()
+        self.assertNotIn("first_name",
+                         self.storage.get(User, usr.id).__dict__)
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/bitcask_storage.py.
+    Classes for Unittest:
+        TestBitcaskStorage_instantiation
+        TestBitcaskStorage_methods
+"""
+import os
+import unittest
+from models.engine.bitcask_storage import BitcaskStorage
+from models.user import User
+from models.state import State
+from tests.test_models.test_engine import engine_case
+
+
+class TestBitcaskStorage_instantiation(unittest.TestCase):
+    """Testing the instantiation of BitcaskStorage class."""
+
+    def test_BitcaskStorage_init_no_args(self):
+        self.assertEqual(type(BitcaskStorage()), BitcaskStorage)
+
+    def test_BitcaskStorage_init_with_arg(self):
+        with self.assertRaises(TypeError):
+            BitcaskStorage(None)
+
+    def test_BitcaskStorage_data_path_is_private_str(self):
+        self.assertEqual(str,
+                         type(BitcaskStorage._BitcaskStorage__data_path))
+
+
+class TestBitcaskStorage_methods(engine_case.EngineTestCase):
+    """Testing methods of BitcaskStorage class."""
+    engine = BitcaskStorage
+    path_attr = "_BitcaskStorage__data_path"
+    path = "test.cask"
+
+    def test_get_builds_only_its_object(self):
+        usr = User()
+        State()
+        self.storage.save()
+        self.reopen()
+        self.storage.get("User", usr.id)
+        self.assertEqual(["User." + usr.id], list(BitcaskStorage._objects))
+
+    def test_reload_from_hint(self):
+        usr = User()
+        usr.save()
+        self.storage.close()
+        self.assertTrue(os.path.isfile("test.cask.hint"))
+        st_class = State()
+        st_class.save()
+        self.reopen()
+        self.assertIsNotNone(self.storage.get(User, usr.id))
+        self.assertIsNotNone(self.storage.get(State, st_class.id))
+
+    def test_truncated_hint_ignored(self):
+        usr = User()
+        st_class = State()
+        self.storage.save()
+        self.storage.close()
+        size = os.path.getsize("test.cask.hint")
+        for cut in (3, 20, size - 30):
+            self.storage.close()
+            with open("test.cask.hint", "r+b") as fl:
+                fl.truncate(cut)
+            BitcaskStorage._objects = {}
+            self.storage.reload()
+            self.assertIsNotNone(self.storage.get(User, usr.id))
+            self.assertIsNotNone(self.storage.get(State, st_class.id))
+            self.assertEqual(2, self.storage.count())
+
+    def test_torn_record_dropped(self):
+        usr = User()
+        usr.save()
+        size = os.path.getsize("test.cask")
+        self.storage.close()
+        os.remove("test.cask.hint")
+        with open("test.cask", "ab") as fl:
+            fl.write(b"\x00\x00\x00")
+        self.reopen()
+        self.assertEqual(size, os.path.getsize("test.cask"))
+        self.assertIsNotNone(self.storage.get(User, usr.id))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+    def test_append_after_other_process(self):
+        usr = User()
+        usr.save()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self.storage.reload()
+                st_class = State()
+                st_class.name = "California"
+                st_class.save()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        usr.first_name = "Betty"
+        usr.save()
+        self.assertEqual("Betty", self.storage.get(User, usr.id).first_name)
+        self.assertEqual(1, self.storage.count(State))
+        self.reopen()
+        self.assertEqual("Betty", self.storage.get(User, usr.id).first_name)
+        self.assertEqual("California",
+                         list(self.storage.by_class(State).values())[0].name)
+
+    def test_merge(self):
+        usr = User()
+        for i in range(10):
+            usr.number = i
+            usr.save()
+        st_class = State()
+        st_class.save()
+        self.storage.delete(st_class)
+        self.storage.save()
+        size = os.path.getsize("test.cask")
+        self.storage.merge()
+        self.assertLess(os.path.getsize("test.cask"), size)
+        self.reopen()
+        self.assertEqual(9, self.storage.get(User, usr.id).number)
+        self.assertEqual(1, self.storage.count())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/dbm_storage.py.
+    Classes for Unittest:
+        TestDBMStorage_instantiation
+        TestDBMStorage_methods
+"""
+import dbm
+import json
+import unittest
+from models.engine.dbm_storage import DBMStorage
+from models.user import User
+from models.state import State
+from tests.test_models.test_engine import engine_case
+
+
+class TestDBMStorage_instantiation(unittest.TestCase):
+    """Testing the instantiation of DBMStorage class."""
+
+    def test_DBMStorage_init_no_args(self):
+        self.assertEqual(type(DBMStorage()), DBMStorage)
+
+    def test_DBMStorage_init_with_arg(self):
+        with self.assertRaises(TypeError):
+            DBMStorage(None)
+
+    def test_DBMStorage_db_path_is_private_str(self):
+        self.assertEqual(str, type(DBMStorage._DBMStorage__db_path))
+
+
+class TestDBMStorage_methods(engine_case.EngineTestCase):
+    """Testing methods of DBMStorage class."""
+    engine = DBMStorage
+    path_attr = "_DBMStorage__db_path"
+    path = "test.dbm"
+
+    def test_one_record_per_object(self):
+        usr = User()
+        usr.first_name = "Betty"
+        st_class = State()
+        self.storage.save()
+        self.storage.close()
+        with dbm.open("test.dbm", "r") as db:
+            self.assertEqual({b"User." + usr.id.encode(),
+                              b"State." + st_class.id.encode()},
+                             set(db.keys()))
+            self.assertEqual(usr.to_dict(),
+                             json.loads(db["User." + usr.id]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,13 +4,34 @@
     Classes for Unittest:
         TestFileStorage_instantiation
         TestFileStorage_methods
+        TestFileStorage_journal
+        TestFileStorage_partitions
+        TestFileStorage_dirty
+        TestFileStorage_transaction
+        TestFileStorage_flusher
+        TestFileStorage_bgsave
+        TestFileStorage_snapshot_cache
+        TestFileStorage_sharded
+        TestFileStorage_lazy
+        TestFileStorage_budget
+        TestFileStorage_blobs
+        TestFileStorage_compression
+        TestFileStorage_shared
+        TestFileStorage_refresh
+        TestFileStorage_concurrency
+        TestFileStorage_snapshot
 """
+import glob
 import os
+import threading
 import unittest
 import models
 import json
 from datetime import datetime
+from time import sleep
+from unittest.mock import patch
 from models.base_model import BaseModel
+from models.engine.blob_store import BlobRef
 from models.engine.file_storage import FileStorage
 from models.amenity import Amenity
 from models.review import Review
@@ -20,6 +41,34 @@ from models.place import Place
 from models.city import City
 
 
+class FileStorageTestCase(unittest.TestCase):
+    """Base of the FileStorage tests: sets file.json aside and starts
+    from empty storage, then removes the files a test wrote next to
+    file.json, unsets the storage options listed in options and puts
+    file.json back."""
+    options = ()
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__pending = {}
+        FileStorage._FileStorage__dirty = {}
+
+    def tearDown(self):
+        for name in self.options:
+            models.storage.__dict__.pop(name, None)
+        for name in glob.glob("file.json*"):
+            os.remove(name)
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+
 class TestFileStorage_instantiation(unittest.TestCase):
     """Testing the instantiation of FileStorage class."""
 
@@ -171,7 +220,1256 @@ class TestFileStorage_methods(unittest.TestCase):
         with self.assertRaises(TypeError):
             models.storage.reload(None)
 
+    def test_reload_progress(self):
+        FileStorage._FileStorage__objects = {}
+        for i in range(5):
+            User()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        counts = []
+        models.storage.progress = counts.append
+        models.storage.progress_every = 2
+        try:
+            models.storage.reload()
+        finally:
+            del models.storage.progress
+            del models.storage.progress_every
+        self.assertEqual([2, 4, 5], counts)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+    def test_reload_parallel(self):
+        FileStorage._FileStorage__objects = {}
+        saved = [User(), State(), Place(), Review(), City()]
+        saved[0].first_name = "Betty"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload_workers = 2
+        models.storage.parallel_min_size = 0
+        try:
+            models.storage.reload()
+        finally:
+            del models.storage.reload_workers
+            del models.storage.parallel_min_size
+        for obj in saved:
+            key = obj.__class__.__name__ + "." + obj.id
+            self.assertEqual(obj.to_dict(),
+                             models.storage.all()[key].to_dict())
+
+    def test_reload_truncated_file(self):
+        FileStorage._FileStorage__objects = {}
+        usr = User()
+        st_class = State()
+        models.storage.save()
+        with open("file.json", "r") as f:
+            text = f.read()
+        with open("file.json", "w") as f:
+            f.write(text[:-20])
+        FileStorage._FileStorage__objects = {}
+        try:
+            with self.assertWarns(RuntimeWarning):
+                models.storage.reload()
+            with open("file.json.corrupt", "r") as f:
+                self.assertEqual(text[:-20], f.read())
+        finally:
+            try:
+                os.remove("file.json.corrupt")
+            except IOError:
+                pass
+        self.assertIn("User." + usr.id, models.storage.all())
+        self.assertNotIn("State." + st_class.id, models.storage.all())
+
+    def test_reload_corrupt_value(self):
+        FileStorage._FileStorage__objects = {}
+        User()
+        models.storage.save()
+        with open("file.json", "w") as f:
+            f.write('{"User.1": {"id": "1", "__class__": "User"}, '
+                    '"User.2": tru, "User.3": {}}')
+        FileStorage._FileStorage__objects = {}
+        with self.assertRaises(ValueError):
+            models.storage.reload()
+
+
+class TestFileStorage_journal(FileStorageTestCase):
+    """Testing the journaled save mode of FileStorage class."""
+    options = ("journal",)
+
+    def setUp(self):
+        super().setUp()
+        models.storage.journal = True
+
+    def test_save_appends_to_log(self):
+        usr = User()
+        usr.save()
+        self.assertFalse(os.path.isfile("file.json"))
+        with open("file.json.log", "r") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(1, len(records))
+        self.assertEqual("create", records[0]["op"])
+        self.assertEqual("User." + usr.id, records[0]["key"])
+
+    def test_reload_replays_log(self):
+        usr = User()
+        st_class = State()
+        models.storage.save()
+        usr.first_name = "Betty"
+        usr.save()
+        models.storage.delete(st_class)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objcts = models.storage.all()
+        self.assertIn("User." + usr.id, objcts)
+        self.assertEqual("Betty", objcts["User." + usr.id].first_name)
+        self.assertNotIn("State." + st_class.id, objcts)
+
+    def test_save_does_not_revive_deleted(self):
+        usr = User()
+        usr.save()
+        models.storage.delete(usr)
+        models.storage.save()
+        usr.save()
+        self.assertEqual(0, models.storage.count())
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertNotIn("User." + usr.id, models.storage.all())
+
+    def test_save_writes_changes_in_place(self):
+        usr = User()
+        usr.tags = [1]
+        usr.first_name = "Betty"
+        usr.save()
+        usr.tags.append(2)
+        del usr.first_name
+        usr.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        usr = models.storage.all()["User." + usr.id]
+        self.assertEqual([1, 2], usr.tags)
+        self.assertNotIn("first_name", usr.__dict__)
+
+    def test_replay_whole_second_timestamp(self):
+        usr = User()
+        models.storage.save()
+        usr.updated_at = datetime(2020, 1, 1)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(datetime(2020, 1, 1),
+                         models.storage.all()["User." + usr.id].updated_at)
+
+    def test_compact_folds_log(self):
+        models.storage.journal_limit = 0
+        try:
+            usr = User()
+            usr.save()
+        finally:
+            del models.storage.journal_limit
+        self.assertFalse(os.path.isfile("file.json.log"))
+        with open("file.json", "r") as f:
+            self.assertIn("User." + usr.id, f.read())
+
+    def test_reload_drops_torn_record(self):
+        usr = User()
+        usr.save()
+        with open("file.json.log", "a") as f:
+            f.write('{"op": "create", "key": "User.1", "da')
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("User." + usr.id, models.storage.all())
+        self.assertNotIn("User.1", models.storage.all())
+        with open("file.json.log", "r") as f:
+            self.assertTrue(f.read().endswith("\n"))
+
+
+class TestFileStorage_partitions(FileStorageTestCase):
+    """Testing the per-class partitions of FileStorage class."""
+
+    def test_count(self):
+        User()
+        User()
+        State()
+        self.assertEqual(2, models.storage.count(User))
+        self.assertEqual(2, models.storage.count("User"))
+        self.assertEqual(1, models.storage.count("State"))
+        self.assertEqual(0, models.storage.count("City"))
+        self.assertEqual(3, models.storage.count())
+
+    def test_by_class(self):
+        usr = User()
+        st_class = State()
+        users = models.storage.by_class("User")
+        self.assertEqual({"User." + usr.id: usr}, users)
+        self.assertNotIn("State." + st_class.id, users)
+        self.assertEqual({}, models.storage.by_class(Review))
+
+    def test_delete_updates_partition(self):
+        usr = User()
+        models.storage.delete(usr)
+        self.assertEqual(0, models.storage.count("User"))
+        self.assertEqual({}, models.storage.by_class("User"))
+
+    def test_partitions_follow_replaced_objects(self):
+        User()
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(0, models.storage.count("User"))
+        usr = User()
+        models.storage.all().pop("User." + usr.id)
+        self.assertEqual(0, models.storage.count("User"))
+
+
+class TestFileStorage_dirty(FileStorageTestCase):
+    """Testing dirty tracking and cached fragments of FileStorage class."""
+    options = ("journal", "fragment_cache")
+
+    def test_setattr_marks_dirty(self):
+        usr = User()
+        models.storage.save()
+        key = "User." + usr.id
+        self.assertNotIn(key, FileStorage._FileStorage__dirty)
+        usr.first_name = "Betty"
+        self.assertEqual({"first_name"}, FileStorage._FileStorage__dirty[key])
+        self.assertNotIn(key, FileStorage._FileStorage__fragments)
+
+    def test_save_reuses_clean_fragments(self):
+        usr = User()
+        st_class = State()
+        models.storage.save()
+
+        def fail():
+            raise AssertionError("clean object encoded again")
+        st_class.__dict__["to_dict"] = fail
+        usr.first_name = "Betty"
+        models.storage.save()
+        del st_class.__dict__["to_dict"]
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual("Betty", saved["User." + usr.id]["first_name"])
+        self.assertIn("State." + st_class.id, saved)
+
+    def test_save_without_fragment_cache(self):
+        models.storage.save()
+        models.storage.fragment_cache = False
+        usr = User()
+        usr.first_name = "Betty"
+        models.storage.save()
+        self.assertEqual({}, FileStorage._FileStorage__fragments)
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual(usr.to_dict(), saved["User." + usr.id])
+
+    def test_save_leaves_no_temporary_file(self):
+        User()
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.json.tmp"))
+
+    def test_save_syncs_file_and_directory(self):
+        User()
+        synced = []
+        fsync = os.fsync
+
+        def record(fd):
+            synced.append(os.path.realpath("/proc/self/fd/{}".format(fd)))
+            fsync(fd)
+        with patch("os.fsync", side_effect=record):
+            models.storage.save()
+        self.assertEqual([os.path.realpath("file.json.tmp"), os.getcwd()],
+                         synced)
+
+    def test_failed_save_keeps_previous_file(self):
+        usr = User()
+        models.storage.save()
+        with open("file.json", "r") as f:
+            before = f.read()
+        usr.first_name = "Betty"
+        with patch.object(User, "to_dict", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertEqual(before, f.read())
+        self.assertFalse(os.path.exists("file.json.tmp"))
+
+    def test_journal_update_only_changed_fields(self):
+        models.storage.journal = True
+        usr = User()
+        models.storage.save()
+        usr.first_name = "Betty"
+        models.storage.save()
+        with open("file.json.log", "r") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual("update", records[-1]["op"])
+        self.assertEqual({"first_name": "Betty"}, records[-1]["data"])
+
+    def test_deleted_attribute_is_saved(self):
+        usr = User()
+        usr.first_name = "Betty"
+        models.storage.save()
+        del usr.first_name
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertNotIn("first_name", json.load(f)["User." + usr.id])
+
+
+class TestFileStorage_transaction(FileStorageTestCase):
+    """Testing transactions of FileStorage class."""
+
+    def tearDown(self):
+        if models.storage.in_transaction():
+            models.storage.rollback()
+        super().tearDown()
+
+    def test_saves_deferred_until_commit(self):
+        with models.storage.transaction():
+            usr = User()
+            usr.save()
+            self.assertFalse(os.path.isfile("file.json"))
+        with open("file.json", "r") as f:
+            self.assertIn("User." + usr.id, f.read())
+
+    def test_rollback(self):
+        usr = User()
+        usr.first_name = "Betty"
+        st_class = State()
+        models.storage.save()
+        models.storage.begin()
+        usr.first_name = "Holberton"
+        usr.last_name = "School"
+        models.storage.delete(st_class)
+        cty = City()
+        cty.save()
+        models.storage.rollback()
+        self.assertEqual("Betty", usr.first_name)
+        self.assertNotIn("last_name", usr.__dict__)
+        self.assertIs(st_class, models.storage.get(State, st_class.id))
+        self.assertIsNone(models.storage.get(City, cty.id))
+        self.assertEqual(1, models.storage.count(State))
+        self.assertFalse(models.storage.in_transaction())
+
+    def test_rollback_on_error(self):
+        usr = User()
+        with self.assertRaises(KeyError):
+            with models.storage.transaction():
+                usr.first_name = "Betty"
+                raise KeyError
+        self.assertNotIn("first_name", usr.__dict__)
+
+    def test_begin_twice(self):
+        models.storage.begin()
+        with self.assertRaises(RuntimeError):
+            models.storage.begin()
+
+    def test_commit_without_begin(self):
+        with self.assertRaises(RuntimeError):
+            models.storage.commit()
+        with self.assertRaises(RuntimeError):
+            models.storage.rollback()
+
+    def test_no_write_inside(self):
+        models.storage.journal = True
+        try:
+            usr = User()
+            models.storage.save()
+            models.storage.begin()
+            st_class = State()
+            for write in (models.storage.flush, models.storage.compact,
+                          models.storage.bgsave):
+                with self.assertRaises(RuntimeError):
+                    write()
+            models.storage.rollback()
+            models.storage.close()
+            models.storage.compact()
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            self.assertIn("User." + usr.id, models.storage.all())
+            self.assertNotIn("State." + st_class.id, models.storage.all())
+        finally:
+            models.storage.journal = False
+            if os.path.isfile("file.json.log"):
+                os.remove("file.json.log")
+
+
+class TestFileStorage_flusher(FileStorageTestCase):
+    """Testing the background flusher of FileStorage class."""
+    options = ("flush_interval", "flush_max_pending")
+
+    def setUp(self):
+        super().setUp()
+        models.storage.flush_interval = 60
+
+    def tearDown(self):
+        models.storage.close()
+        super().tearDown()
+
+    def test_save_returns_before_writing(self):
+        User().save()
+        self.assertFalse(os.path.isfile("file.json"))
+        self.assertEqual(1, FileStorage._FileStorage__unflushed)
+
+    def test_flush_on_interval(self):
+        models.storage.flush_interval = 0.01
+        usr = User()
+        usr.save()
+        for i in range(100):
+            if os.path.isfile("file.json"):
+                break
+            sleep(0.01)
+        with open("file.json", "r") as f:
+            self.assertIn("User." + usr.id, f.read())
+
+    def test_flush_on_max_pending(self):
+        models.storage.flush_max_pending = 2
+        usr = User()
+        usr.save()
+        usr.save()
+        for i in range(100):
+            if not FileStorage._FileStorage__unflushed:
+                break
+            sleep(0.01)
+        with open("file.json", "r") as f:
+            self.assertIn("User." + usr.id, f.read())
+
+    def test_close_flushes(self):
+        usr = User()
+        usr.save()
+        models.storage.close()
+        self.assertIsNone(FileStorage._FileStorage__flusher)
+        with open("file.json", "r") as f:
+            self.assertIn("User." + usr.id, f.read())
+
+    def test_flush_writes_now(self):
+        usr = User()
+        usr.save()
+        models.storage.flush()
+        with open("file.json", "r") as f:
+            self.assertIn("User." + usr.id, f.read())
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+class TestFileStorage_bgsave(FileStorageTestCase):
+    """Testing background snapshots of FileStorage class."""
+    options = ("journal",)
+
+    def tearDown(self):
+        models.storage.close()
+        FileStorage._FileStorage__bgsave = None
+        super().tearDown()
+
+    def wait(self):
+        """waits for the background snapshot to finish"""
+        for i in range(500):
+            status = models.storage.bgsave_status()
+            if status["state"] != "running":
+                return status
+            sleep(0.01)
+        return status
+
+    def test_status_idle(self):
+        self.assertEqual("idle", models.storage.bgsave_status()["state"])
+
+    def test_bgsave_writes_snapshot(self):
+        usr = User()
+        self.assertTrue(models.storage.bgsave())
+        status = self.wait()
+        self.assertEqual("done", status["state"])
+        self.assertIsNone(status["pid"])
+        with open("file.json", "r") as f:
+            self.assertIn("User." + usr.id, f.read())
+
+    def test_bgsave_trims_journal(self):
+        models.storage.journal = True
+        usr = User()
+        usr.save()
+        models.storage.bgsave()
+        self.wait()
+        st_class = State()
+        st_class.save()
+        with open("file.json.log", "r") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(["State." + st_class.id],
+                         [record["key"] for record in records])
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("User." + usr.id, models.storage.all())
+        self.assertIn("State." + st_class.id, models.storage.all())
+
+    def test_newer_snapshot_wins(self):
+        User()
+        models.storage.bgsave()
+        st_class = State()
+        models.storage.save()
+        self.wait()
+        with open("file.json", "r") as f:
+            self.assertIn("State." + st_class.id, f.read())
+
+
+class TestFileStorage_snapshot_cache(FileStorageTestCase):
+    """Testing the pickled snapshot cache of FileStorage class."""
+    options = ("snapshot_cache",)
+
+    def setUp(self):
+        super().setUp()
+        models.storage.snapshot_cache = True
+        self.usr = User()
+        self.usr.first_name = "Betty"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+
+    def test_reload_builds_cache(self):
+        models.storage.reload()
+        self.assertTrue(os.path.isfile("file.json.cache"))
+        usr = models.storage.get(User, self.usr.id)
+        self.assertEqual(self.usr.to_dict(), usr.to_dict())
+
+    def test_reload_from_cache(self):
+        models.storage.reload()
+        FileStorage._FileStorage__objects = {}
+        with patch("models.engine.file_storage.iter_items") as iter_items:
+            models.storage.reload()
+            iter_items.assert_not_called()
+        usr = models.storage.get(User, self.usr.id)
+        self.assertEqual(self.usr.to_dict(), usr.to_dict())
+
+    def test_stale_cache_ignored(self):
+        models.storage.reload()
+        st_class = State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("State." + st_class.id, models.storage.all())
+
+    def test_close_refreshes_cache(self):
+        models.storage.reload()
+        st_class = State()
+        models.storage.save()
+        models.storage.close()
+        FileStorage._FileStorage__objects = {}
+        with patch("models.engine.file_storage.iter_items") as iter_items:
+            models.storage.reload()
+            iter_items.assert_not_called()
+        self.assertIn("State." + st_class.id, models.storage.all())
+
+
+class TestFileStorage_sharded(FileStorageTestCase):
+    """Testing the per-class shard files of FileStorage class."""
+    options = ("sharded",)
+
+    def setUp(self):
+        super().setUp()
+        models.storage.sharded = True
+        self.usr = User()
+        self.rv = Review()
+        models.storage.save()
+
+    def tearDown(self):
+        for name in glob.glob("file.*.json"):
+            os.remove(name)
+        super().tearDown()
+
+    def test_one_file_per_class(self):
+        self.assertTrue(os.path.isfile("file.User.json"))
+        self.assertTrue(os.path.isfile("file.Review.json"))
+        self.assertFalse(os.path.isfile("file.json"))
+        with open("file.User.json", "r") as fl:
+            self.assertEqual(["User." + self.usr.id], list(json.load(fl)))
+
+    def test_json_file_folded_in(self):
+        for name in os.listdir("."):
+            if name.startswith("file."):
+                os.remove(name)
+        models.storage.sharded = False
+        models.storage.save()
+        models.storage.sharded = True
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        models.storage.save()
+        self.assertFalse(os.path.isfile("file.json"))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("User." + self.usr.id, models.storage.all())
+        self.assertIn("Review." + self.rv.id, models.storage.all())
+
+    def test_only_changed_shards_rewritten(self):
+        before = os.stat("file.User.json").st_mtime_ns
+        os.utime("file.User.json", ns=(before - 10 ** 9, before - 10 ** 9))
+        self.rv.text = "Nice"
+        models.storage.save()
+        after = os.stat("file.User.json").st_mtime_ns
+        self.assertEqual(before - 10 ** 9, after)
+        with open("file.Review.json", "r") as fl:
+            self.assertEqual("Nice", json.load(fl)["Review." + self.rv.id]
+                             ["text"])
+
+    def test_delete_empties_shard(self):
+        models.storage.delete(self.rv)
+        models.storage.save()
+        with open("file.Review.json", "r") as fl:
+            self.assertEqual({}, json.load(fl))
+
+    def test_reload_reads_shards(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual(self.usr.to_dict(), objs["User." + self.usr.id]
+                         .to_dict())
+        self.assertIn("Review." + self.rv.id, objs)
+        before = os.stat("file.User.json").st_mtime_ns
+        os.utime("file.User.json", ns=(before - 10 ** 9, before - 10 ** 9))
+        models.storage.save()
+        after = os.stat("file.User.json").st_mtime_ns
+        self.assertEqual(before - 10 ** 9, after)
+
+
+class TestFileStorage_lazy(FileStorageTestCase):
+    """Testing the lazy building of objects on reload of FileStorage."""
+    options = ("lazy",)
+
+    def setUp(self):
+        super().setUp()
+        self.usr = User()
+        self.usr.first_name = "Betty"
+        self.st = State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.lazy = True
+        models.storage.reload()
+
+    def test_reload_builds_nothing(self):
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+        self.assertEqual(2, models.storage.count())
+        self.assertEqual(1, models.storage.count(User))
+
+    def test_get_builds_one(self):
+        usr = models.storage.get(User, self.usr.id)
+        self.assertEqual(self.usr.to_dict(), usr.to_dict())
+        self.assertIs(usr, models.storage.get(User, self.usr.id))
+        self.assertEqual(["User." + self.usr.id],
+                         list(FileStorage._FileStorage__objects))
+        self.assertEqual(2, models.storage.count())
+
+    def test_all_builds_every_object(self):
+        objs = models.storage.all()
+        self.assertEqual(2, len(objs))
+        self.assertEqual(self.st.to_dict(),
+                         objs["State." + self.st.id].to_dict())
+
+    def test_save_keeps_unbuilt_records(self):
+        usr = models.storage.get(User, self.usr.id)
+        usr.last_name = "Holberton"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(self.st.to_dict(),
+                         models.storage.get(State, self.st.id).to_dict())
+        self.assertEqual("Holberton",
+                         models.storage.get(User, self.usr.id).last_name)
+
+    def test_journal_update_of_unbuilt_record(self):
+        models.storage.journal = True
+        try:
+            usr = models.storage.get(User, self.usr.id)
+            usr.last_name = "Holberton"
+            models.storage.save()
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            self.assertEqual("Holberton",
+                             models.storage.get(User, self.usr.id).last_name)
+        finally:
+            del models.storage.journal
+
+
+class TestFileStorage_budget(FileStorageTestCase):
+    """Testing the memory budget of FileStorage class."""
+
+    def setUp(self):
+        super().setUp()
+        models.storage.max_objects = 2
+        self.stats = models.storage.cache_stats()
+        self.users = [User() for i in range(4)]
+        models.storage.save()
+
+    def tearDown(self):
+        models.storage.__dict__.pop("max_objects", None)
+        FileStorage._FileStorage__objects = {}
+        models.storage.close()
+        super().tearDown()
+
+    def test_least_recently_used_spilled(self):
+        objs = FileStorage._FileStorage__objects
+        self.assertEqual(["User." + usr.id for usr in self.users[2:]],
+                         list(objs))
+        self.assertEqual(4, models.storage.count())
+        self.assertEqual(4, models.storage.count(User))
+        stats = models.storage.cache_stats()
+        self.assertEqual(self.stats["evictions"] + 2, stats["evictions"])
+        self.assertEqual(2, stats["spilled"])
+
+    def test_get_loads_spilled_back(self):
+        stats = models.storage.cache_stats()
+        usr = models.storage.get(User, self.users[0].id)
+        self.assertIs(self.users[0], usr)
+        self.assertIsNotNone(models.storage.get(User, self.users[0].id))
+        after = models.storage.cache_stats()
+        self.assertEqual(stats["misses"] + 1, after["misses"])
+        self.assertEqual(stats["hits"] + 1, after["hits"])
+        self.assertEqual(2, after["resident"])
+
+    def test_spilled_built_again_when_dropped(self):
+        key = "User." + self.users[0].id
+        data = self.users[0].to_dict()
+        self.users = []
+        usr = models.storage.get(User, key.partition(".")[2])
+        self.assertEqual(data, usr.to_dict())
+
+    def test_change_to_spilled_instance_saved(self):
+        self.users[0].first_name = "Betty"
+        self.users[0].save()
+        FileStorage._FileStorage__objects = {}
+        del models.storage.max_objects
+        models.storage.reload()
+        self.assertEqual("Betty", models.storage.get(
+            User, self.users[0].id).first_name)
+        models.storage.max_objects = 2
+
+    def test_save_writes_spilled(self):
+        State().save()
+        with open("file.json", "r") as fl:
+            self.assertEqual(5, len(json.load(fl)))
+        self.assertEqual(5, len(models.storage.all()))
+
+    def test_all_stays_in_budget(self):
+        self.assertEqual(4, len(models.storage.all()))
+        self.assertEqual(2, models.storage.cache_stats()["resident"])
+        self.assertEqual(2, len(FileStorage._FileStorage__objects))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_reload_removes_left_spills(self):
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0)
+        os.waitpid(pid, 0)
+        left = "file.json.spill-{}.db".format(pid)
+        with open(left, "w") as fl:
+            fl.write("spilled by a process that crashed")
+        mine = "file.json.spill-{}".format(os.getpid())
+        self.assertTrue(glob.glob(mine + "*"))
+        models.storage.reload()
+        self.assertFalse(os.path.exists(left))
+        self.assertTrue(glob.glob(mine + "*"))
+        del models.storage.max_objects
+        models.storage.all()
+        models.storage.close()
+        self.assertEqual([], glob.glob("file.json.spill*"))
+        models.storage.max_objects = 2
+
+
+class TestFileStorage_blobs(FileStorageTestCase):
+    """Testing the out-of-line long strings of FileStorage class."""
+    options = ("blob_threshold",)
+
+    def setUp(self):
+        super().setUp()
+        models.storage.blob_threshold = 100
+        self.text = "A lovely place. " * 50
+        self.rv = Review()
+        self.rv.text = self.text
+        self.rv.save()
+
+    def reload(self):
+        """reads the objects back as a new process would"""
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        return models.storage.get(Review, self.rv.id)
+
+    def test_long_string_out_of_line(self):
+        with open("file.json", "r") as fl:
+            data = json.load(fl)["Review." + self.rv.id]
+        self.assertEqual(["__blob__"], list(data["text"]))
+        self.assertLess(os.path.getsize("file.json"), len(self.text))
+        self.assertGreater(os.path.getsize("file.json.blobs"),
+                           len(self.text))
+
+    def test_loaded_on_first_read(self):
+        rv = self.reload()
+        self.assertIsNot(self.rv, rv)
+        self.assertIs(BlobRef, type(rv.__dict__["text"]))
+        self.assertEqual(self.text, rv.text)
+        self.assertEqual(self.text, rv.__dict__["text"])
+        self.assertEqual(self.rv.to_dict(), rv.to_dict())
+
+    def test_to_dict_and_str_unchanged(self):
+        rv = self.reload()
+        self.assertEqual(self.text, rv.to_dict()["text"])
+        self.assertIn(repr(self.text), str(self.reload()))
+
+    def test_same_content_stored_once(self):
+        size = os.path.getsize("file.json.blobs")
+        other = Review()
+        other.text = self.text
+        other.save()
+        self.assertEqual(size, os.path.getsize("file.json.blobs"))
+
+    def test_update_and_short_strings(self):
+        rv = self.reload()
+        rv.text = "Short"
+        rv.save()
+        self.assertEqual("Short", self.reload().text)
+        self.assertEqual("", Review.text)
+
+    def test_key_attributes_inline(self):
+        models.storage.blob_threshold = 10
+        usr = User()
+        usr.save()
+        usr.first_name = "Alice"
+        usr.save()
+        self.assertIs(str, type(usr.__dict__["id"]))
+        with open("file.json", "r") as fl:
+            data = json.load(fl)["User." + usr.id]
+        self.assertEqual(usr.id, data["id"])
+        self.assertEqual("Alice", data["first_name"])
+
+    def test_compact_reclaims(self):
+        size = os.path.getsize("file.json.blobs")
+        for i in range(3):
+            self.rv.text = "An even lovelier place {}. ".format(i) * 50
+            self.rv.save()
+        self.assertGreater(os.path.getsize("file.json.blobs"), 3 * size)
+        models.storage.compact()
+        self.assertLess(os.path.getsize("file.json.blobs"), 2 * size)
+        self.assertEqual(self.rv.text, self.reload().text)
+
+    def test_compact_keeps_records_not_built(self):
+        models.storage.lazy = True
+        try:
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            models.storage.compact()
+            self.assertEqual(self.text, self.reload().text)
+        finally:
+            del models.storage.lazy
+
+
+class TestFileStorage_compression(FileStorageTestCase):
+    """Testing the compressed JSON file of FileStorage class."""
+    options = ("compression", "compression_level")
+
+    def setUp(self):
+        super().setUp()
+        self.usr = User()
+        self.usr.first_name = "Betty"
+        self.pl = Place()
+
+    def round_trip(self, magic):
+        """saves, checks the file starts with magic and reloads"""
+        models.storage.save()
+        with open("file.json", "rb") as fl:
+            self.assertTrue(fl.read().startswith(magic))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(self.usr.to_dict(),
+                         models.storage.get(User, self.usr.id).to_dict())
+        self.assertIn("Place." + self.pl.id, models.storage.all())
+
+    def test_gzip(self):
+        models.storage.compression = "gzip"
+        self.round_trip(b"\x1f\x8b")
+
+    def test_bz2(self):
+        models.storage.compression = "bz2"
+        models.storage.compression_level = 1
+        self.round_trip(b"BZh1")
+
+    def test_lzma(self):
+        models.storage.compression = "lzma"
+        self.round_trip(b"\xfd7zXZ\x00")
+
+    def test_plain_file_read_after_switch(self):
+        models.storage.save()
+        models.storage.compression = "gzip"
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("User." + self.usr.id, models.storage.all())
+
+    def test_unknown_compression(self):
+        models.storage.compression = "zip"
+        with self.assertRaises(ValueError):
+            models.storage.save()
+
+
+class TestFileStorage_shared(FileStorageTestCase):
+    """Testing FileStorage shared by several processes."""
+    options = ("shared",)
+
+    def setUp(self):
+        super().setUp()
+        models.storage.shared = True
+        self.usr = User()
+        self.usr.first_name = "Betty"
+        models.storage.save()
+
+    def other_process(self, func):
+        """runs func in a forked process that starts from the file"""
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                FileStorage._FileStorage__objects = {}
+                FileStorage._FileStorage__pending = {}
+                FileStorage._FileStorage__dirty = {}
+                FileStorage._FileStorage__seen = None
+                models.storage.reload()
+                func()
+                code = 0
+            finally:
+                os._exit(code)
+        self.assertEqual(0, os.waitpid(pid, 0)[1])
+
+    def saved(self):
+        """the content of the JSON file"""
+        with open("file.json", "r") as f:
+            return json.load(f)
+
+    def test_save_keeps_objects_of_other_process(self):
+        self.other_process(lambda: State().save())
+        Place().save()
+        classes = sorted(key.partition(".")[0] for key in self.saved())
+        self.assertEqual(["Place", "State", "User"], classes)
+
+    def test_save_merges_changed_fields(self):
+        def change():
+            usr = models.storage.get(User, self.usr.id)
+            usr.last_name = "Holberton"
+            usr.save()
+        self.other_process(change)
+        self.usr.email = "betty@example.com"
+        models.storage.save()
+        saved = self.saved()["User." + self.usr.id]
+        self.assertEqual("Holberton", saved["last_name"])
+        self.assertEqual("betty@example.com", saved["email"])
+        self.assertEqual("Holberton", self.usr.last_name)
+
+    def test_save_keeps_update_with_same_updated_at(self):
+        def change():
+            usr = models.storage.get(User, self.usr.id)
+            models.storage.touch(usr, "last_name", "Holberton")
+            models.storage.save()
+        self.other_process(change)
+        Place().save()
+        saved = self.saved()["User." + self.usr.id]
+        self.assertEqual(self.usr.updated_at.isoformat(), saved["updated_at"])
+        self.assertEqual("Holberton", saved["last_name"])
+        self.assertEqual("Holberton", self.usr.last_name)
+
+    def test_reload_sees_update_with_same_updated_at(self):
+        def change():
+            usr = models.storage.get(User, self.usr.id)
+            models.storage.touch(usr, "last_name", "Holberton")
+            models.storage.save()
+        self.other_process(change)
+        models.storage.reload()
+        self.assertEqual("Holberton", self.usr.last_name)
+
+    def test_save_keeps_local_delete(self):
+        self.other_process(lambda: State().save())
+        models.storage.delete(self.usr)
+        models.storage.save()
+        self.assertNotIn("User." + self.usr.id, self.saved())
+
+    def test_reload_drops_objects_deleted_elsewhere(self):
+        def delete():
+            models.storage.delete(models.storage.get(User, self.usr.id))
+            models.storage.save()
+        self.other_process(delete)
+        models.storage.reload()
+        self.assertIsNone(models.storage.get(User, self.usr.id))
+
+    def test_reload_skipped_when_unchanged(self):
+        with patch.object(FileStorage, "_FileStorage__load") as load:
+            models.storage.reload()
+        load.assert_not_called()
+        self.other_process(lambda: State().save())
+        models.storage.reload()
+        self.assertEqual(1, models.storage.count(State))
+
+    def test_writes_counted(self):
+        Place().save()
+        with open("file.json.lock", "r") as f:
+            first = int(f.read())
+        self.other_process(lambda: State().save())
+        with open("file.json.lock", "r") as f:
+            self.assertEqual(first + 1, int(f.read()))
+
+    def test_reload_keeps_references(self):
+        def change():
+            usr = models.storage.get(User, self.usr.id)
+            usr.first_name = "Holberton"
+            usr.save()
+        self.other_process(change)
+        models.storage.reload()
+        self.assertIs(self.usr, models.storage.get(User, self.usr.id))
+        self.assertEqual("Holberton", self.usr.first_name)
+
+
+class TestFileStorage_refresh(FileStorageTestCase):
+    """Testing the incremental reload of FileStorage class."""
+    options = ("incremental", "journal", "lazy")
+
+    def setUp(self):
+        super().setUp()
+        self.usr = User()
+        self.usr.first_name = "Betty"
+        self.pl = Place()
+        models.storage.save()
+
+    def rewrite(self, change):
+        """changes the saved records of the JSON file with change"""
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        change(saved)
+        with open("file.json", "w") as f:
+            json.dump(saved, f)
+
+    def test_unchanged(self):
+        report = models.storage.refresh()
+        self.assertEqual({"added": [], "changed": [], "removed": []},
+                         report)
+        self.assertIs(self.usr, models.storage.get(User, self.usr.id))
+
+    def test_changed_in_place(self):
+        def change(saved):
+            record = saved["User." + self.usr.id]
+            record["first_name"] = "Holberton"
+            record["updated_at"] = datetime.now().isoformat()
+        self.rewrite(change)
+        report = models.storage.refresh()
+        self.assertEqual(["User." + self.usr.id], report["changed"])
+        self.assertIs(self.usr, models.storage.get(User, self.usr.id))
+        self.assertEqual("Holberton", self.usr.first_name)
+
+    def test_content_comparison(self):
+        def change(saved):
+            saved["User." + self.usr.id]["first_name"] = "Holberton"
+        self.rewrite(change)
+        self.assertEqual([], models.storage.refresh()["changed"])
+        report = models.storage.refresh("content")
+        self.assertEqual(["User." + self.usr.id], report["changed"])
+        self.assertEqual("Holberton", self.usr.first_name)
+
+    def test_added_and_removed(self):
+        state = State()
+        models.storage.save()
+        key = "State." + state.id
+        models.storage.delete(state)
+        FileStorage._FileStorage__pending = {}
+        self.rewrite(lambda saved: saved.pop("Place." + self.pl.id))
+        report = models.storage.refresh()
+        self.assertEqual([key], report["added"])
+        self.assertEqual(["Place." + self.pl.id], report["removed"])
+        self.assertIsNone(models.storage.get(Place, self.pl.id))
+
+    def test_unsaved_changes_kept(self):
+        def change(saved):
+            record = saved["User." + self.usr.id]
+            record["first_name"] = "Holberton"
+            record["last_name"] = "School"
+            record["updated_at"] = datetime.now().isoformat()
+        self.rewrite(change)
+        self.usr.first_name = "Bob"
+        amenity = Amenity()
+        models.storage.refresh()
+        self.assertEqual("Bob", self.usr.first_name)
+        self.assertEqual("School", self.usr.last_name)
+        self.assertIn("Amenity." + amenity.id, models.storage.all())
+
+    def test_journal(self):
+        models.storage.journal = True
+        self.usr.first_name = "Holberton"
+        self.usr.save()
+        models.storage.delete(self.pl)
+        models.storage.save()
+        self.usr.__dict__["first_name"] = "Betty"
+        FileStorage._FileStorage__objects["Place." + self.pl.id] = self.pl
+        report = models.storage.refresh("content")
+        self.assertEqual(["User." + self.usr.id], report["changed"])
+        self.assertEqual(["Place." + self.pl.id], report["removed"])
+        self.assertEqual("Holberton", self.usr.first_name)
+
+    def test_incremental_reload(self):
+        models.storage.incremental = True
+        self.usr.__dict__["first_name"] = "Bob"
+        models.storage.reload()
+        self.assertEqual("Bob", self.usr.first_name)
+        self.assertIs(self.usr, models.storage.get(User, self.usr.id))
+
+    def test_lazy_records_stay_unbuilt(self):
+        models.storage.lazy = True
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.rewrite(lambda saved: saved["User." + self.usr.id].update(
+            updated_at=datetime.now().isoformat(), first_name="Holberton"))
+        report = models.storage.refresh()
+        self.assertEqual(["User." + self.usr.id], report["changed"])
+        self.assertEqual(0, models.storage.cache_stats()["resident"])
+        self.assertEqual("Holberton",
+                         models.storage.get(User, self.usr.id).first_name)
+
+    def test_unknown_comparison(self):
+        with self.assertRaises(ValueError):
+            models.storage.refresh("hash")
+
+
+class TestFileStorage_concurrency(FileStorageTestCase):
+    """Testing FileStorage used from several threads."""
+
+    def setUp(self):
+        super().setUp()
+        self.usr = User()
+        self.st = State()
+
+    def test_readers_run_during_save(self):
+        done = {}
+
+        def during_save():
+            reader = threading.Thread(
+                target=lambda: done.update(count=models.storage.count()))
+            writer = threading.Thread(
+                target=lambda: done.update(new=BaseModel()))
+            reader.start()
+            reader.join(5)
+            writer.start()
+            writer.join(0.1)
+            done["writer_waited"] = writer.is_alive()
+            return {}
+        with patch.object(User, "to_dict", side_effect=during_save):
+            models.storage.save()
+        self.assertEqual(2, done["count"])
+        self.assertTrue(done["writer_waited"])
+
+    def test_save_survives_changes_to_all(self):
+        key = "State." + self.st.id
+
+        def pop():
+            models.storage.all().pop(key, None)
+            return {"id": self.usr.id}
+        with patch.object(User, "to_dict", side_effect=pop):
+            models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertIn("User." + self.usr.id, json.load(f))
+
+    def test_all_is_live(self):
+        self.assertIs(models.storage.all(), models.storage.all())
+        usr = User()
+        self.assertIn("User." + usr.id, models.storage.all())
+        self.assertIsNot(models.storage.all(), models.storage.copy())
+
+    def test_iterate_copy_while_creating(self):
+        stop = threading.Event()
+
+        def create():
+            while not stop.is_set():
+                models.storage.delete(Place())
+        creator = threading.Thread(target=create)
+        creator.start()
+        try:
+            for i in range(200):
+                for key, obj in models.storage.copy().items():
+                    str(obj)
+                for n, obj in enumerate(models.storage.copy().values()):
+                    if n == 0:
+                        User()
+        finally:
+            stop.set()
+            creator.join()
+        self.assertEqual(201, models.storage.count(User))
+
+
+class TestFileStorage_snapshot(FileStorageTestCase):
+    """Testing the point-in-time snapshots of FileStorage class."""
+    options = ("lazy",)
+
+    def setUp(self):
+        super().setUp()
+        self.usr = User()
+        self.usr.first_name = "Betty"
+        self.st = State()
+        models.storage.save()
+
+    def history(self):
+        """the version chains kept"""
+        return FileStorage._FileStorage__versions.history
+
+    def test_point_in_time(self):
+        with models.storage.snapshot() as snap:
+            self.usr.first_name = "Holberton"
+            models.storage.delete(self.st)
+            pl = Place()
+            keys = {"User." + self.usr.id, "State." + self.st.id}
+            self.assertEqual(keys, set(snap.all()))
+            self.assertEqual(2, snap.count())
+            self.assertEqual("Betty", snap.get(User, self.usr.id).first_name)
+            self.assertIsNone(snap.get(Place, pl.id))
+            self.assertEqual("Holberton", self.usr.first_name)
+        self.assertEqual({}, self.history())
+
+    def test_copies_detached(self):
+        with models.storage.snapshot() as snap:
+            copy = snap.get(User, self.usr.id)
+            self.assertIsNot(self.usr, copy)
+            copy.first_name = "Holberton"
+            self.assertEqual("Betty", self.usr.first_name)
+            self.assertEqual("Betty", snap.get(User, self.usr.id).first_name)
+
+    def test_nothing_kept_without_snapshot(self):
+        self.usr.first_name = "Holberton"
+        self.assertEqual({}, self.history())
+
+    def test_gc_keeps_what_open_snapshots_see(self):
+        first = models.storage.snapshot()
+        self.usr.first_name = "A"
+        second = models.storage.snapshot()
+        self.usr.first_name = "B"
+        first.close()
+        self.assertEqual(1, len(self.history()["User." + self.usr.id]))
+        self.assertEqual("A", second.get(User, self.usr.id).first_name)
+        second.close()
+        self.assertEqual({}, self.history())
+
+    def test_rollback(self):
+        with models.storage.snapshot() as snap:
+            with models.storage.transaction():
+                self.usr.first_name = "A"
+            models.storage.begin()
+            self.usr.first_name = "B"
+            models.storage.rollback()
+            self.assertEqual("A", self.usr.first_name)
+            self.assertEqual("Betty", snap.get(User, self.usr.id).first_name)
+
+    def test_records_not_built(self):
+        models.storage.lazy = True
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        with models.storage.snapshot() as snap:
+            usr = models.storage.get(User, self.usr.id)
+            usr.first_name = "Holberton"
+            self.assertEqual("Betty", snap.get(User, self.usr.id).first_name)
+            self.assertEqual(1, len(snap.by_class(State)))
+            self.assertEqual(1, models.storage.cache_stats()["resident"])
+
+    def test_reads_keep_no_history(self):
+        models.storage.lazy = True
+        models.storage.max_objects = 1
+        self.addCleanup(models.storage.__dict__.pop, "max_objects")
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        with models.storage.snapshot():
+            models.storage.get(User, self.usr.id)
+            models.storage.get(State, self.st.id)
+            models.storage.get(User, self.usr.id)
+            models.storage.all()
+            models.storage.by_class(State)
+            self.assertEqual({}, self.history())
+            models.storage.delete(models.storage.get(State, self.st.id))
+            self.assertEqual(["State." + self.st.id], list(self.history()))
+
 
 if __name__ == "__main__":
     unittest.main()
-
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/json_stream.py.
+    Classes for Unittest:
+        TestJsonStream_iter_items
+"""
+import json
+import unittest
+from io import StringIO
+from models.engine.json_stream import TruncatedError, iter_items
+
+
+class TestJsonStream_iter_items(unittest.TestCase):
+    """Testing the iter_items reader."""
+
+    def setUp(self):
+        self.dic = {"User.{}".format(i): {"id": str(i), "text": '"},{' * i,
+                                          "ids": [1, 2.5, None]}
+                    for i in range(50)}
+        self.text = json.dumps(self.dic)
+
+    def test_reads_all_entries(self):
+        self.assertEqual(self.dic, dict(iter_items(StringIO(self.text))))
+
+    def test_small_chunks(self):
+        for size in (1, 2, 7, 64):
+            self.assertEqual(self.dic,
+                             dict(iter_items(StringIO(self.text), size)))
+
+    def test_yields_in_file_order(self):
+        keys = [key for key, value in iter_items(StringIO(self.text), 5)]
+        self.assertEqual(list(self.dic), keys)
+
+    def test_empty(self):
+        self.assertEqual({}, dict(iter_items(StringIO(""))))
+        self.assertEqual({}, dict(iter_items(StringIO(" {} "))))
+
+    def test_truncated(self):
+        for cut in range(1, len(self.text), 97):
+            items = []
+            with self.assertRaises(TruncatedError):
+                for item in iter_items(StringIO(self.text[:-cut]), 8):
+                    items.append(item)
+            self.assertEqual(list(self.dic.items())[:len(items)], items)
+        items = list(self.dic.items())
+        text = self.text[:self.text.index(', "User.49"') + 20]
+        with self.assertRaises(TruncatedError):
+            for item in iter_items(StringIO(text)):
+                self.assertEqual(items.pop(0), item)
+        self.assertEqual(1, len(items))
+
+    def test_bad_value_in_the_middle(self):
+        text = '{"a": 1, "b": tru, "c": 3}'
+        for size in (1, 4, 1 << 16):
+            with self.assertRaises(ValueError):
+                list(iter_items(StringIO(text), size))
+
+    def test_bad_value_fails_fast(self):
+        text = StringIO('{"a": 1, "b": tru, "c": 3' + ', "d": 4' * 1000 + '}')
+        with self.assertRaises(ValueError) as err:
+            list(iter_items(text, 64))
+        self.assertNotIsInstance(err.exception, TruncatedError)
+        self.assertEqual(64, text.tell())
+
+    def test_not_an_object(self):
+        with self.assertRaises(ValueError):
+            list(iter_items(StringIO("[1, 2]")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/lazy_records.py.
+    Classes for Unittest:
+        TestLazyRecords
+"""
+import unittest
+from models.engine.lazy_records import LazyRecords
+
+
+class TestLazyRecords(unittest.TestCase):
+    """Testing the records kept until their objects are built."""
+
+    def setUp(self):
+        self.records = LazyRecords()
+        self.records.add("User.1", {"id": "1"})
+        self.records.add("User.2", {"id": "2"})
+        self.records.add("Place.3", {"id": "3"})
+
+    def test_by_class(self):
+        self.assertEqual({"User", "Place"}, self.records.names())
+        self.assertEqual(2, self.records.count("User"))
+        self.assertEqual(3, self.records.count())
+        self.assertEqual(["Place.3"], list(self.records.keys("Place")))
+        self.assertEqual(0, self.records.count("City"))
+        self.assertEqual([], list(self.records.items("City")))
+
+    def test_pop(self):
+        self.assertIn("User.1", self.records)
+        self.assertEqual({"id": "1"}, self.records.pop("User.1"))
+        self.assertNotIn("User.1", self.records)
+        self.assertIsNone(self.records.pop("User.1"))
+        self.records.pop("Place.3")
+        self.assertEqual({"User"}, self.records.names())
+        self.records.pop("User.2")
+        self.assertFalse(self.records)
+
+    def test_add_replaces(self):
+        self.records.add("User.1", {"id": "1", "name": "Betty"})
+        self.assertEqual("Betty", self.records.get("User.1")["name"])
+        self.assertEqual(3, self.records.count())
+        self.assertIsNone(self.records.get("User.9"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/lsm_storage.py.
+    Classes for Unittest:
+        TestLSMStorage_instantiation
+        TestLSMStorage_methods
+"""
+import os
+import unittest
+from models.engine.lsm_storage import LSMStorage
+from models.review import Review
+from models.user import User
+from models.state import State
+from tests.test_models.test_engine import engine_case
+
+
+class TestLSMStorage_instantiation(unittest.TestCase):
+    """Testing the instantiation of LSMStorage class."""
+
+    def test_LSMStorage_init_no_args(self):
+        self.assertEqual(type(LSMStorage()), LSMStorage)
+
+    def test_LSMStorage_init_with_arg(self):
+        with self.assertRaises(TypeError):
+            LSMStorage(None)
+
+    def test_LSMStorage_dir_path_is_private_str(self):
+        self.assertEqual(str, type(LSMStorage._LSMStorage__dir_path))
+
+
+class TestLSMStorage_methods(engine_case.EngineTestCase):
+    """Testing methods of LSMStorage class."""
+    engine = LSMStorage
+    path_attr = "_LSMStorage__dir_path"
+    path = "test.lsm"
+
+    def setUp(self):
+        super().setUp()
+        self.storage.memtable_limit = 10
+        self.storage.tier_size = 3
+
+    def segments(self):
+        """names of the segment files of the tree"""
+        return sorted(name for name in os.listdir("test.lsm")
+                      if name.endswith(".seg"))
+
+    def test_memtable_flushed_to_segments(self):
+        reviews = [Review() for i in range(25)]
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(["L0-00000001.seg"], self.segments())
+        self.reopen()
+        for rv in reviews:
+            self.assertEqual(rv.to_dict(),
+                             self.storage.get(Review, rv.id).to_dict())
+        self.assertEqual(25, self.storage.count(Review))
+
+    def test_tiered_compaction(self):
+        reviews = []
+        for i in range(40):
+            rv = Review()
+            rv.text = str(i)
+            rv.save()
+            reviews.append(rv)
+        self.storage.close()
+        self.assertIn("L1-00000003.seg", self.segments())
+        self.assertNotIn("L0-00000001.seg", self.segments())
+        self.reopen()
+        self.assertEqual(40, self.storage.count(Review))
+        self.assertEqual("7", self.storage.get(Review, reviews[7].id).text)
+
+    def test_newest_record_wins(self):
+        usr = User()
+        for i in range(30):
+            usr.number = i
+            usr.save()
+            State().save()
+        self.reopen()
+        self.assertEqual(29, self.storage.get(User, usr.id).number)
+        self.assertEqual(1, self.storage.count(User))
+        self.assertEqual(30, self.storage.count(State))
+
+    def test_delete_writes_tombstone(self):
+        usr = User()
+        usr.save()
+        for i in range(30):
+            State().save()
+        self.storage.delete(usr)
+        self.storage.save()
+        self.reopen()
+        self.assertIsNone(self.storage.get(User, usr.id))
+        self.assertEqual(0, self.storage.count(User))
+        self.assertEqual({}, self.storage.by_class(User))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/parallel_reload.py.
+    Classes for Unittest:
+        TestParallelReload_split
+        TestParallelReload_decode
+"""
+import json
+import os
+import unittest
+from datetime import datetime
+from models.engine import parallel_reload
+
+
+class TestParallelReload_split(unittest.TestCase):
+    """Testing how the JSON file is cut into slices."""
+
+    def setUp(self):
+        date_t = datetime.today().isoformat()
+        self.dic = {"User.{}".format(i): {"id": str(i), "__class__": "User",
+                                          "created_at": date_t,
+                                          "updated_at": date_t,
+                                          "text": '"}, "User.x": {' * i}
+                    for i in range(40)}
+        with open("test_parallel.json", "w") as f:
+            json.dump(self.dic, f)
+
+    def tearDown(self):
+        os.remove("test_parallel.json")
+
+    def decode_all(self, parts):
+        """decodes every slice in order"""
+        records = []
+        for start, end in parallel_reload.split("test_parallel.json", parts):
+            records += parallel_reload.decode("test_parallel.json",
+                                              start, end)
+        return records
+
+    def test_slices_hold_whole_entries(self):
+        for parts in (1, 2, 7, 100):
+            records = self.decode_all(parts)
+            self.assertEqual(list(self.dic), [key for key, _ in records])
+
+    def test_slice_count(self):
+        self.assertEqual(1, len(parallel_reload.split(
+            "test_parallel.json", 1)))
+        self.assertEqual(4, len(parallel_reload.split(
+            "test_parallel.json", 4)))
+
+    def test_timestamps_parsed(self):
+        key, value = self.decode_all(3)[0]
+        self.assertEqual(datetime, type(value["created_at"]))
+        self.assertEqual(datetime, type(value["updated_at"]))
+
+    def test_empty_object(self):
+        with open("test_parallel.json", "w") as f:
+            f.write("{}")
+        self.assertEqual([], parallel_reload.split("test_parallel.json", 4))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+    def test_iter_records(self):
+        records = []
+        for chunk in parallel_reload.iter_records("test_parallel.json", 2):
+            records += chunk
+        self.assertEqual(list(self.dic), [key for key, _ in records])
+
+
+class TestParallelReload_decode(unittest.TestCase):
+    """Testing the validation done while decoding a slice."""
+
+    def tearDown(self):
+        os.remove("test_parallel.json")
+
+    def test_rejects_mismatched_class(self):
+        with open("test_parallel.json", "w") as f:
+            json.dump({"User.1": {"id": "1", "__class__": "State"}}, f)
+        with self.assertRaises(ValueError):
+            start, end = parallel_reload.split("test_parallel.json", 1)[0]
+            parallel_reload.decode("test_parallel.json", start, end)
+
+    def test_not_an_object(self):
+        with open("test_parallel.json", "w") as f:
+            f.write("[1, 2]")
+        with self.assertRaises(ValueError):
+            parallel_reload.split("test_parallel.json", 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
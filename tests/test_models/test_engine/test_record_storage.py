@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/record_storage.py.
+    Classes for Unittest:
+        TestRecordStorage
+"""
+import json
+import unittest
+import models
+from models.engine.record_storage import RecordStorage
+from models.user import User
+from models.state import State
+
+
+class Engine(RecordStorage):
+    """the smallest engine the base works with, its records in a
+    dictionary"""
+    _objects = {}
+    _pending = {}
+    records = {}
+    saves = 0
+
+    def _read(self, key):
+        return Engine.records.get(key)
+
+    def _stored(self, key):
+        return key in Engine.records
+
+    def _records(self, name=None):
+        for key in list(Engine.records):
+            if name is None or key.partition(".")[0] == name:
+                yield key, None
+
+    def _count(self, name=None):
+        return sum(1 for record in self._records(name))
+
+    def _write(self, records):
+        Engine.saves += 1
+        for key, value in records:
+            if value is None:
+                Engine.records.pop(key, None)
+            else:
+                Engine.records[key] = json.dumps(value)
+
+    def _reopen(self):
+        pass
+
+
+class TestRecordStorage(unittest.TestCase):
+    """Testing the methods the RecordStorage base gives an engine."""
+
+    def setUp(self):
+        Engine._objects = {}
+        Engine._pending = {}
+        Engine.records = {}
+        Engine.saves = 0
+        self.engine = Engine()
+        self.saved = models.storage
+        models.storage = self.engine
+        self.usr = User()
+        self.usr.save()
+
+    def tearDown(self):
+        models.storage = self.saved
+        Engine._txn = None
+
+    def test_new_and_save(self):
+        self.assertEqual({}, Engine._pending)
+        self.assertIn("User." + self.usr.id, Engine.records)
+        st_class = State()
+        self.assertEqual({"State." + st_class.id: "create"}, Engine._pending)
+        self.engine.new(self.usr)
+        self.assertNotIn("User." + self.usr.id, Engine._pending)
+
+    def test_get_builds_once(self):
+        self.engine.reload()
+        self.assertEqual({}, Engine._objects)
+        usr = self.engine.get(User, self.usr.id)
+        self.assertIsNot(self.usr, usr)
+        self.assertEqual(self.usr.to_dict(), usr.to_dict())
+        self.assertIs(usr, self.engine.get("User", self.usr.id))
+        self.assertIsNone(self.engine.get(User, "missing"))
+
+    def test_delete_and_count(self):
+        st_class = State()
+        self.assertEqual(2, self.engine.count())
+        self.assertEqual(1, self.engine.count(State))
+        self.engine.delete(st_class)
+        self.engine.delete(self.usr)
+        self.assertEqual({"User." + self.usr.id: "delete"}, Engine._pending)
+        self.assertEqual(0, self.engine.count())
+        self.assertIsNone(self.engine.get(User, self.usr.id))
+        self.engine.save()
+        self.assertEqual({}, Engine.records)
+
+    def test_all_and_by_class(self):
+        st_class = State()
+        st_class.save()
+        self.engine.reload()
+        self.assertEqual(["State." + st_class.id],
+                         list(self.engine.by_class("State")))
+        self.assertEqual({"User." + self.usr.id, "State." + st_class.id},
+                         set(self.engine.all()))
+
+    def test_reload_keeps_unsaved(self):
+        self.usr.first_name = "Betty"
+        self.engine.reload()
+        self.assertIs(self.usr, self.engine.get(User, self.usr.id))
+
+    def test_touch_marks_pending(self):
+        self.engine.touch(self.usr, "first_name", "Betty")
+        self.assertEqual("Betty", self.usr.first_name)
+        self.assertEqual({"User." + self.usr.id: "update"}, Engine._pending)
+
+    def test_commit_saves_once(self):
+        with self.engine.transaction():
+            self.usr.first_name = "Betty"
+            self.engine.save()
+            self.engine.save()
+            self.assertTrue(self.engine.in_transaction())
+        self.assertEqual(2, Engine.saves)
+        self.assertFalse(self.engine.in_transaction())
+
+    def test_rollback(self):
+        pending = Engine._pending
+        self.engine.begin()
+        self.usr.first_name = "Betty"
+        State()
+        self.engine.rollback()
+        self.assertNotIn("first_name", self.usr.__dict__)
+        self.assertIs(pending, Engine._pending)
+        self.assertEqual({}, pending)
+        self.assertEqual(["User." + self.usr.id], list(Engine._objects))
+
+    def test_misuse(self):
+        with self.assertRaises(RuntimeError):
+            self.engine.commit()
+        self.engine.begin()
+        with self.assertRaises(RuntimeError):
+            self.engine.begin()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/rwlock.py.
+    Classes for Unittest:
+        TestRWLock_methods
+"""
+import threading
+import unittest
+from models.engine.rwlock import RWLock
+
+
+class TestRWLock_methods(unittest.TestCase):
+    """Testing the reader-writer lock."""
+
+    def setUp(self):
+        self.lock = RWLock()
+
+    def in_thread(self, func):
+        """runs func in another thread, returns what it returned"""
+        result = []
+        thread = threading.Thread(target=lambda: result.append(func()))
+        thread.start()
+        thread.join(5)
+        return result[0]
+
+    def test_readers_share(self):
+        with self.lock.reading():
+            def read():
+                with self.lock.reading():
+                    return True
+            self.assertTrue(self.in_thread(read))
+
+    def test_writer_excludes_readers_and_writers(self):
+        with self.lock:
+            self.assertFalse(self.in_thread(
+                lambda: self.lock.acquire(timeout=0.05)))
+
+    def test_reader_excludes_writer(self):
+        with self.lock.reading():
+            self.assertFalse(self.in_thread(
+                lambda: self.lock.acquire(blocking=False)))
+
+    def test_reentrant(self):
+        with self.lock:
+            with self.lock:
+                with self.lock.reading():
+                    pass
+        with self.lock.reading():
+            with self.lock.reading():
+                pass
+        self.assertTrue(self.in_thread(
+            lambda: self.lock.acquire(blocking=False)))
+
+    def test_no_upgrade(self):
+        with self.lock.reading():
+            with self.assertRaises(RuntimeError):
+                self.lock.acquire()
+
+    def test_release_unheld(self):
+        with self.assertRaises(RuntimeError):
+            self.lock.release()
+
+    def test_downgraded_lets_readers_in_not_writers(self):
+        with self.lock:
+            with self.lock.downgraded():
+                def read():
+                    with self.lock.reading():
+                        return True
+                self.assertTrue(self.in_thread(read))
+                self.assertFalse(self.in_thread(
+                    lambda: self.lock.acquire(timeout=0.05)))
+            self.assertFalse(self.in_thread(
+                lambda: self.lock.acquire(blocking=False)))
+        self.assertTrue(self.in_thread(
+            lambda: self.lock.acquire(blocking=False)))
+
+    def test_no_upgrade_while_downgraded(self):
+        with self.lock:
+            with self.lock.downgraded():
+                with self.assertRaises(RuntimeError):
+                    self.lock.acquire()
+                with self.assertRaises(RuntimeError):
+                    with self.lock:
+                        pass
+            with self.lock:
+                pass
+
+    def test_writer_waits_for_readers(self):
+        entered = threading.Event()
+        leave = threading.Event()
+
+        def read():
+            with self.lock.reading():
+                entered.set()
+                leave.wait(5)
+        thread = threading.Thread(target=read)
+        thread.start()
+        entered.wait(5)
+        self.assertFalse(self.lock.acquire(timeout=0.05))
+        leave.set()
+        self.assertTrue(self.lock.acquire(timeout=5))
+        self.lock.release()
+        thread.join(5)
+
+    def test_condition(self):
+        cond = threading.Condition(self.lock)
+        ready = []
+
+        def notify():
+            with cond:
+                ready.append(True)
+                cond.notify()
+        with self.lock:
+            with cond:
+                threading.Thread(target=notify).start()
+                self.assertTrue(cond.wait_for(lambda: ready, 5))
+            self.assertTrue(self.lock._is_owned())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/snapshot_cache.py.
+    Classes for Unittest:
+        TestSnapshotCache
+"""
+import os
+import unittest
+from models.engine.snapshot_cache import SnapshotCache
+
+
+class TestSnapshotCache(unittest.TestCase):
+    """Testing the pickled cache of the JSON file."""
+
+    def setUp(self):
+        self.cache = SnapshotCache()
+        with open("test.json", "w") as fl:
+            fl.write('{"User.1": {}}')
+
+    def tearDown(self):
+        for name in ("test.json", "test.json.cache"):
+            if os.path.exists(name):
+                os.remove(name)
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.load("test.json"))
+        self.cache.write("test.json", {"User.1": [1, 2]}, os.replace)
+        self.assertTrue(self.cache.current("test.json"))
+        self.assertEqual({"User.1": [1, 2]},
+                         SnapshotCache().load("test.json"))
+
+    def test_stale_after_file_changes(self):
+        self.cache.write("test.json", {"User.1": 1}, os.replace)
+        with open("test.json", "w") as fl:
+            fl.write('{"User.2": {}, "User.3": {}}')
+        self.assertFalse(self.cache.current("test.json"))
+        self.assertIsNone(self.cache.load("test.json"))
+
+    def test_damaged_cache_ignored(self):
+        with open("test.json.cache", "wb") as fl:
+            fl.write(b"not a pickle")
+        self.assertIsNone(self.cache.load("test.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
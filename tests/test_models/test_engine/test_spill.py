@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/spill.py.
+    Classes for Unittest:
+        TestSpill
+"""
+import glob
+import os
+import unittest
+from models.engine.spill import Spill
+from models.user import User
+
+
+class TestSpill(unittest.TestCase):
+    """Testing the spill file and the order of use."""
+
+    def setUp(self):
+        self.spill = Spill()
+        self.path = "test.spill-{}".format(os.getpid())
+
+    def tearDown(self):
+        if self.spill.db is not None:
+            self.spill.db.close()
+        for name in glob.glob("test.spill-*"):
+            os.remove(name)
+
+    def test_order_of_use(self):
+        self.spill.used("User.1", 10)
+        self.spill.used("User.2", 20)
+        self.spill.used("User.1", 5)
+        self.assertEqual(["User.2", "User.1"], list(self.spill.recent))
+        self.assertEqual(25, self.spill.resident)
+        self.spill.forget("User.2")
+        self.assertEqual(5, self.spill.resident)
+
+    def test_track_puts_unseen_first(self):
+        self.spill.used("User.1", 1)
+        self.spill.used("User.gone", 1)
+        objects = {"User.1": None, "User.2": None, "User.3": None}
+        self.spill.track(objects, lambda obj: 3)
+        self.assertEqual(["User.3", "User.2", "User.1"],
+                         list(self.spill.recent))
+        self.assertEqual(7, self.spill.resident)
+
+    def test_put_and_take(self):
+        usr = User()
+        self.spill.used("User." + usr.id, 1)
+        self.spill.put(self.path, "User." + usr.id, '{"a": 1}', usr)
+        self.assertIn("User." + usr.id, self.spill)
+        self.assertEqual(1, self.spill.count("User"))
+        self.assertEqual(0, self.spill.resident)
+        self.assertIs(usr, self.spill.evicted["User." + usr.id])
+        self.assertEqual('{"a": 1}', self.spill.take("User." + usr.id))
+        self.assertIsNone(self.spill.take("User." + usr.id))
+        self.assertFalse(self.spill)
+        self.assertEqual(1, self.spill.stats["evictions"])
+
+    def test_close_keeps_file_while_spilled(self):
+        self.spill.put(self.path, "User.1", "{}", User())
+        self.spill.close()
+        self.assertIsNotNone(self.spill.db)
+        self.spill.take("User.1")
+        self.spill.close()
+        self.assertIsNone(self.spill.db)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_clear_removes_files_of_ended_processes(self):
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0)
+        os.waitpid(pid, 0)
+        left = "test.spill-{}.db".format(pid)
+        with open(left, "w") as fl:
+            fl.write("left by a process that ended")
+        self.spill.put(self.path, "User.1", "{}", User())
+        self.spill.clear("test.spill-")
+        self.assertFalse(os.path.exists(left))
+        self.assertTrue(glob.glob(self.path + "*"))
+
+
+if __name__ == "__main__":
+    unittest.main()
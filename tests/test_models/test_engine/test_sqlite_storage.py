@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/sqlite_storage.py.
+    Classes for Unittest:
+        TestSQLiteStorage_instantiation
+        TestSQLiteStorage_methods
+"""
+import unittest
+from models.engine.sqlite_storage import SQLiteStorage
+from models.user import User
+from tests.test_models.test_engine import engine_case
+
+
+class TestSQLiteStorage_instantiation(unittest.TestCase):
+    """Testing the instantiation of SQLiteStorage class."""
+
+    def test_SQLiteStorage_init_no_args(self):
+        self.assertEqual(type(SQLiteStorage()), SQLiteStorage)
+
+    def test_SQLiteStorage_init_with_arg(self):
+        with self.assertRaises(TypeError):
+            SQLiteStorage(None)
+
+    def test_SQLiteStorage_db_path_is_private_str(self):
+        self.assertEqual(str, type(SQLiteStorage._SQLiteStorage__db_path))
+
+
+class TestSQLiteStorage_methods(engine_case.EngineTestCase):
+    """Testing methods of SQLiteStorage class."""
+    engine = SQLiteStorage
+    path_attr = "_SQLiteStorage__db_path"
+    path = "test.db"
+
+    def test_new(self):
+        usr = User()
+        self.assertIn("User." + usr.id, self.storage.all())
+        self.assertIs(usr, self.storage.get(User, usr.id))
+
+    def test_delete(self):
+        usr = User()
+        usr.save()
+        self.storage.delete(usr)
+        self.assertIsNone(self.storage.get("User", usr.id))
+        self.storage.save()
+        self.reopen()
+        self.assertIsNone(self.storage.get("User", usr.id))
+        self.assertNotIn("User." + usr.id, self.storage.all())
+
+    def test_transaction_commit(self):
+        with self.storage.transaction():
+            usr = User()
+            usr.save()
+            self.assertEqual(0, self.storage._SQLiteStorage__execute(
+                "SELECT COUNT(*) FROM objects").fetchone()[0])
+        self.reopen()
+        self.assertIsNotNone(self.storage.get(User, usr.id))
+
+
+if __name__ == "__main__":
+    unittest.main()
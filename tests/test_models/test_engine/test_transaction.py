@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/transaction.py.
+    Classes for Unittest:
+        TestTransaction
+"""
+import unittest
+from models.engine.transaction import Transaction
+from models.user import User
+
+
+class TestTransaction(unittest.TestCase):
+    """Testing the Transaction undo log."""
+
+    def setUp(self):
+        self.store = {}
+        self.txn = Transaction("saved")
+
+    def test_saved(self):
+        self.assertEqual("saved", self.txn.saved)
+        self.assertFalse(self.txn.deferred)
+
+    def test_undo_restores_attributes(self):
+        usr = User()
+        self.store["User." + usr.id] = usr
+        self.txn.capture("User." + usr.id, usr)
+        usr.first_name = "Betty"
+        self.txn.capture("User." + usr.id, usr)
+        self.txn.undo(self.store.__setitem__, self.store.pop)
+        self.assertNotIn("first_name", usr.__dict__)
+        self.assertIs(usr, self.store["User." + usr.id])
+
+    def test_undo_drops_new_keys(self):
+        self.txn.capture("User.1", None)
+        self.store["User.1"] = User()
+        self.txn.undo(self.store.__setitem__, self.store.pop)
+        self.assertEqual({}, self.store)
+
+    def test_undo_puts_back_removed(self):
+        usr = User()
+        self.txn.capture("User." + usr.id, usr)
+        self.txn.undo(self.store.__setitem__, self.store.pop)
+        self.assertIs(usr, self.store["User." + usr.id])
+
+
+if __name__ == "__main__":
+    unittest.main()
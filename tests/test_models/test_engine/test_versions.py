@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""
+    Unittests for models/engine/versions.py.
+    Classes for Unittest:
+        TestVersions
+        TestSnapshot
+"""
+import unittest
+from models.engine.versions import Snapshot, Versions
+
+
+class TestVersions(unittest.TestCase):
+    """Testing the version chains."""
+
+    def setUp(self):
+        self.versions = Versions()
+        self.state = {"k": "v0"}
+
+    def change(self, key, value):
+        """changes key to value, remembering its state first"""
+        self.versions.remember(key, lambda: self.state.get(key))
+        self.state[key] = value
+
+    def seen(self, key, version):
+        """the state of key a snapshot of version sees"""
+        kept, state = self.versions.visible(key, version)
+        return state if kept else self.state.get(key)
+
+    def test_nothing_kept_without_snapshot(self):
+        self.change("k", "v1")
+        self.assertEqual({}, self.versions.history)
+
+    def test_snapshots_see_their_version(self):
+        first = self.versions.open()
+        self.change("k", "v1")
+        self.change("k", "v2")
+        second = self.versions.open()
+        self.change("k", "v3")
+        self.change("new", "n1")
+        self.assertEqual("v0", self.seen("k", first))
+        self.assertEqual("v2", self.seen("k", second))
+        self.assertIsNone(self.seen("new", second))
+        self.assertEqual(2, len(self.versions.history["k"]))
+
+    def test_close_drops_unseen_states(self):
+        first = self.versions.open()
+        self.change("k", "v1")
+        second = self.versions.open()
+        self.change("k", "v2")
+        self.versions.close(first)
+        self.assertEqual("v1", self.seen("k", second))
+        self.assertEqual(1, len(self.versions.history["k"]))
+        self.versions.close(second)
+        self.assertEqual({}, self.versions.history)
+        self.assertEqual({}, dict(self.versions.readers))
+
+
+class TestSnapshot(unittest.TestCase):
+    """Testing the Snapshot reader."""
+
+    def setUp(self):
+        self.closed = []
+        self.objects = {"User.1": "u1", "User.2": "u2", "State.1": "s1"}
+        self.snap = Snapshot(7, lambda version: list(self.objects),
+                             self.read, self.closed.append)
+
+    def read(self, keys, version):
+        """the (key, object) pairs of keys"""
+        self.assertEqual(7, version)
+        return [(key, self.objects[key]) for key in keys
+                if key in self.objects]
+
+    def test_reads(self):
+        self.assertEqual(self.objects, self.snap.all())
+        self.assertEqual({"State.1": "s1"}, self.snap.by_class("State"))
+        self.assertEqual(2, self.snap.count("User"))
+        self.assertEqual("u2", self.snap.get("User", 2))
+        self.assertIsNone(self.snap.get("User", 3))
+
+    def test_chunks(self):
+        self.snap.chunk = 2
+        self.assertEqual(list(self.objects.items()), list(self.snap.items()))
+
+    def test_close_once(self):
+        with self.snap as snap:
+            self.assertFalse(snap.closed)
+        self.snap.close()
+        self.assertTrue(self.snap.closed)
+        self.assertEqual([7], self.closed)
+        with self.assertRaises(ValueError):
+            self.snap.all()
+
+    def test_closed_when_collected(self):
+        del self.snap
+        self.assertEqual([7], self.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()